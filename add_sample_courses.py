@@ -1,5 +1,7 @@
 from main import app, db
 from models import Course, User, UserCourse, Quiz, UserQuizResult, StudyGroup
+from services.content_service import render_course_html
+from services.progress_service import enroll
 import random
 from datetime import datetime, timedelta
 
@@ -145,6 +147,7 @@ Use Pandas to load a dataset of your choice, perform some basic data cleaning an
         for course in courses:
             existing_course = Course.query.filter_by(title=course.title).first()
             if not existing_course:
+                course.content_html = render_course_html(course.content)
                 db.session.add(course)
 
         db.session.commit()
@@ -168,35 +171,36 @@ Use Pandas to load a dataset of your choice, perform some basic data cleaning an
         db.session.commit()
 
         # Add user progress for courses
+        enrolled = set(db.session.query(UserCourse.user_id, UserCourse.course_id))
         for user in User.query.all():
             for course in Course.query.all():
-                user_course = UserCourse(user_id=user.id, course_id=course.id, progress=random.uniform(0, 100))
-                db.session.add(user_course)
+                if (user.id, course.id) not in enrolled:
+                    enroll(user.id, course.id, progress=random.uniform(0, 100))
 
         db.session.commit()
 
         # Create sample quizzes
         quizzes = [
             Quiz(course_id=1, title="Python Basics Quiz", questions={
-                "q1": "What is a variable in Python?",
-                "q2": "How do you define a function in Python?",
-                "q3": "What is the difference between a list and a tuple in Python?",
-                "q4": "Explain the concept of object-oriented programming in Python.",
-                "q5": "How do you handle exceptions in Python?"
+                "q1": {"text": "Which keyword defines a function in Python?", "options": ["func", "def", "function", "lambda"], "answer": "def"},
+                "q2": {"text": "Which of these types is immutable?", "options": ["list", "dict", "tuple", "set"], "answer": "tuple"},
+                "q3": {"text": "What does len([1, 2, 3]) return?", "options": ["2", "3", "4", "An error"], "answer": "3"},
+                "q4": {"text": "Which statement handles exceptions?", "options": ["try/except", "if/else", "for/else", "with"], "answer": "try/except"},
+                "q5": {"text": "What is the method that initializes a new object?", "options": ["__new__", "__init__", "__call__", "__start__"], "answer": "__init__"}
             }),
             Quiz(course_id=2, title="Intermediate Python Quiz", questions={
-                "q1": "What is a decorator in Python?",
-                "q2": "Explain the concept of a generator in Python.",
-                "q3": "What is a context manager and how is it used?",
-                "q4": "Describe the difference between multiprocessing and multithreading in Python.",
-                "q5": "What are lambda functions and when should they be used?"
+                "q1": {"text": "What does a decorator take as its argument?", "options": ["A class", "A function", "A module", "A string"], "answer": "A function"},
+                "q2": {"text": "Which keyword turns a function into a generator?", "options": ["return", "yield", "async", "await"], "answer": "yield"},
+                "q3": {"text": "Which methods does a context manager implement?", "options": ["__enter__ and __exit__", "__iter__ and __next__", "__get__ and __set__", "__init__ and __del__"], "answer": "__enter__ and __exit__"},
+                "q4": {"text": "Which module runs CPU-bound work on several cores?", "options": ["threading", "asyncio", "multiprocessing", "queue"], "answer": "multiprocessing"},
+                "q5": {"text": "How many expressions can a lambda contain?", "options": ["One", "Two", "Any number", "None"], "answer": "One"}
             }),
             Quiz(course_id=3, title="Python for Data Science Quiz", questions={
-                "q1": "What is NumPy and why is it used in data science?",
-                "q2": "Explain the difference between a Series and a DataFrame in Pandas.",
-                "q3": "What is the purpose of train_test_split in scikit-learn?",
-                "q4": "Describe the k-means clustering algorithm and its implementation in scikit-learn.",
-                "q5": "What are the main types of plots in Matplotlib and when should each be used?"
+                "q1": {"text": "Which library provides n-dimensional arrays?", "options": ["NumPy", "Matplotlib", "Requests", "Flask"], "answer": "NumPy"},
+                "q2": {"text": "What is a one-dimensional labeled array in Pandas called?", "options": ["DataFrame", "Series", "Panel", "Index"], "answer": "Series"},
+                "q3": {"text": "What does train_test_split do?", "options": ["Scales features", "Splits data into training and test sets", "Trains a model", "Plots results"], "answer": "Splits data into training and test sets"},
+                "q4": {"text": "Which scikit-learn class implements k-means?", "options": ["KMeans", "KNeighborsClassifier", "LinearRegression", "PCA"], "answer": "KMeans"},
+                "q5": {"text": "Which plot shows the distribution of a single variable?", "options": ["Histogram", "Line plot", "Pie chart", "Heatmap"], "answer": "Histogram"}
             }),
         ]
 
@@ -0,0 +1,123 @@
+from models import db, User, Course, UserCourse, Quiz, UserQuizResult, StudyGroup, UserStudyGroup, ForumPost
+from sqlalchemy import create_engine, func, insert, select, text
+from datetime import datetime, timedelta
+import argparse
+import random
+import time
+
+# The indexes added by migration 5d0a3f8e21b6
+BENCHMARKED_INDEXES = [
+    'ix_user_course_user_id_course_id',
+    'ix_user_study_group_user_id_study_group_id',
+    'ix_user_quiz_result_user_id_quiz_id',
+    'ix_quiz_course_id',
+    'ix_forum_post_created_at',
+]
+
+def _indexes():
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    return [indexes[name] for name in BENCHMARKED_INDEXES]
+
+def _insert_batches(conn, table, rows, batch_size=10000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+
+def seed(engine, users, courses, enrollments_per_user, quizzes_per_course, results_per_user, forum_posts, seed_value=42):
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        _insert_batches(conn, User.__table__, (
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'total_study_time': rng.randint(60, 3000)}
+            for i in range(1, users + 1)))
+        _insert_batches(conn, Course.__table__, (
+            {'id': i, 'title': f'Course {i}', 'description': f'Description of course {i}', 'content': ''}
+            for i in range(1, courses + 1)))
+        _insert_batches(conn, UserCourse.__table__, (
+            {'user_id': user_id, 'course_id': course_id, 'progress': rng.uniform(0, 100)}
+            for user_id in range(1, users + 1)
+            for course_id in rng.sample(range(1, courses + 1), min(enrollments_per_user, courses))))
+        n_quizzes = courses * quizzes_per_course
+        _insert_batches(conn, Quiz.__table__, (
+            {'id': i, 'course_id': (i - 1) // quizzes_per_course + 1, 'title': f'Quiz {i}'}
+            for i in range(1, n_quizzes + 1)))
+        _insert_batches(conn, UserQuizResult.__table__, (
+            {'user_id': user_id, 'quiz_id': rng.randint(1, n_quizzes), 'score': rng.uniform(0, 100)}
+            for user_id in range(1, users + 1) for _ in range(results_per_user)))
+        _insert_batches(conn, StudyGroup.__table__, (
+            {'id': i, 'name': f'Group {i}', 'course_id': i} for i in range(1, courses + 1)))
+        _insert_batches(conn, UserStudyGroup.__table__, (
+            {'user_id': user_id, 'study_group_id': group_id}
+            for user_id in range(1, users + 1)
+            for group_id in rng.sample(range(1, courses + 1), min(2, courses))))
+        _insert_batches(conn, ForumPost.__table__, (
+            {'title': f'Post {i}', 'content': 'Question', 'user_id': rng.randint(1, users), 'course_id': rng.randint(1, courses),
+             'created_at': now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))}
+            for i in range(forum_posts)))
+
+def benchmark_queries(users, courses):
+    rng = random.Random(7)
+    return [
+        ('enrollment lookup', lambda: select(UserCourse).where(
+            UserCourse.user_id == rng.randint(1, users), UserCourse.course_id == rng.randint(1, courses))),
+        ('study group membership', lambda: select(UserStudyGroup.id).where(
+            UserStudyGroup.user_id == rng.randint(1, users), UserStudyGroup.study_group_id == rng.randint(1, courses))),
+        ('quiz averages per course', lambda: select(Quiz.course_id, func.avg(UserQuizResult.score)).join(
+            Quiz, UserQuizResult.quiz_id == Quiz.id).where(
+            UserQuizResult.user_id == rng.randint(1, users)).group_by(Quiz.course_id)),
+        ('quizzes of a course', lambda: select(Quiz.id).where(Quiz.course_id == rng.randint(1, courses))),
+        ('latest forum posts', lambda: select(ForumPost.id, ForumPost.title).order_by(ForumPost.created_at.desc()).limit(20)),
+    ]
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN QUERY PLAN' if conn.dialect.name == 'sqlite' else 'EXPLAIN'
+    return [' | '.join(str(column) for column in row) for row in conn.execute(text(f'{prefix} {compiled}'))]
+
+def run_benchmarks(engine, users, courses, repeat):
+    with engine.connect() as conn:
+        for name, make_statement in benchmark_queries(users, courses):
+            print(f"  {name}")
+            for line in explain(conn, make_statement()):
+                print(f"    plan: {line}")
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(make_statement()).fetchall()
+            print(f"    {(time.perf_counter() - start) / repeat * 1000:.3f} ms/query over {repeat} runs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show query plans and timings for the hot lookups without and with the indexes from migration 5d0a3f8e21b6.")
+    parser.add_argument('--database-url', default='sqlite:///bench_indexes.db', help="scratch database; its tables are dropped and recreated")
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--courses', type=int, default=1000)
+    parser.add_argument('--enrollments-per-user', type=int, default=20, help="user_course rows per user (default gives 1,000,000)")
+    parser.add_argument('--quizzes-per-course', type=int, default=5)
+    parser.add_argument('--results-per-user', type=int, default=20)
+    parser.add_argument('--forum-posts', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=200, help="executions per query")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    for index in _indexes():
+        index.drop(engine)
+
+    start = time.monotonic()
+    seed(engine, args.users, args.courses, args.enrollments_per_user, args.quizzes_per_course, args.results_per_user, args.forum_posts)
+    print(f"Seeded {args.users * args.enrollments_per_user} enrollments in {time.monotonic() - start:.1f}s")
+
+    print("Without indexes:")
+    run_benchmarks(engine, args.users, args.courses, args.repeat)
+
+    for index in _indexes():
+        index.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+    print("With indexes:")
+    run_benchmarks(engine, args.users, args.courses, args.repeat)
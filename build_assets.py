@@ -0,0 +1,95 @@
+from config import ASSET_BUILD_DIR
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Already-compressed formats gain nothing from gzip or brotli
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.html', '.svg', '.txt', '.xml', '.map', '.webmanifest'}
+
+
+def fingerprinted_name(path, data):
+    """``js/main.js`` -> ``js/main.<12 hex digits of sha256>.js``."""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def static_files(static_dir, build_dir):
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != build_dir)
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_dir).replace(os.sep, '/'), path
+
+
+def write_if_missing(path, data):
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def build_assets(static_dir=STATIC_DIR, build_dir=ASSET_BUILD_DIR, clean=False):
+    """Write a fingerprinted copy of every static file, plus .gz and .br variants, and the manifest.
+
+    Files from earlier builds are kept (unless ``clean``) so pages still
+    cached by browsers keep resolving their old asset URLs.
+    """
+    build_dir = os.path.abspath(build_dir)
+    if clean:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    manifest = {}
+    written = compressed_bytes = original_bytes = 0
+    for relative_path, path in static_files(os.path.abspath(static_dir), build_dir):
+        with open(path, 'rb') as f:
+            data = f.read()
+        hashed = fingerprinted_name(relative_path, data)
+        manifest[relative_path] = hashed
+        target = os.path.join(build_dir, hashed)
+        if os.path.exists(target):
+            continue
+        write_if_missing(target, data)
+        written += 1
+        if os.path.splitext(relative_path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        gzipped = gzip.compress(data, 9, mtime=0)
+        write_if_missing(target + '.gz', gzipped)
+        smallest = len(gzipped)
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            write_if_missing(target + '.br', compressed)
+            smallest = min(smallest, len(compressed))
+        original_bytes += len(data)
+        compressed_bytes += smallest
+
+    manifest_path = os.path.join(build_dir, 'assets.json')
+    os.makedirs(build_dir, exist_ok=True)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    print(f"{len(manifest)} static files, {written} new builds in {build_dir}")
+    if original_bytes:
+        print(f"New compressible files: {original_bytes} bytes -> {compressed_bytes} bytes compressed")
+    if brotli is None:
+        print("brotli is not installed; only .gz variants were written")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the static files for immutable caching.")
+    parser.add_argument('--build-dir', default=ASSET_BUILD_DIR)
+    parser.add_argument('--clean', action='store_true', help="delete earlier builds first")
+    args = parser.parse_args()
+    build_assets(build_dir=args.build_dir, clean=args.clean)
+    sys.exit(0)
@@ -0,0 +1,304 @@
+from main import app, db
+from models import Course, User, UserCourse, Quiz, UserQuizResult
+from services.content_service import render_course_html
+from services.progress_service import recount
+from services.quiz_engine import compile_answer_key
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# File stem -> model, in the order a directory is loaded
+TABLES = {
+    'courses': Course,
+    'users': User,
+    'enrollments': UserCourse,
+    'quizzes': Quiz,
+    'quiz_results': UserQuizResult,
+}
+
+LEARNING_STYLES = ['visual', 'auditory', 'kinesthetic', 'reading/writing']
+TOPICS = ['Python', 'Data Science', 'Web Development', 'Machine Learning', 'Statistics', 'Databases',
+          'Algorithms', 'Cloud Computing', 'Cybersecurity', 'JavaScript', 'Linear Algebra', 'Networking']
+LEVELS = ['Introduction to', 'Intermediate', 'Advanced', 'Practical', 'Foundations of', 'Applied']
+
+
+def read_rows(path, file_format=None):
+    """Yield one dict per record of a JSONL or CSV file without reading it all into memory."""
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif file_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def _coerce(column, value):
+    if value is None or value == '':
+        return None
+    python_type = column.type.python_type if not isinstance(column.type, db.JSON) else dict
+    if python_type is datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if python_type is dict:
+        return json.loads(value) if isinstance(value, str) else value
+    if python_type is bool:
+        return value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+    return python_type(value)
+
+
+def prepare_rows(model, rows):
+    """Convert raw records into column dicts: typed values and derived columns filled in."""
+    columns = model.__table__.columns
+    for row in rows:
+        if model is Course and row.get('content') and not row.get('content_html'):
+            row['content_html'] = render_course_html(row['content'])
+        if model is User and row.get('password') and not row.get('password_hash'):
+            row['password_hash'] = generate_password_hash(row['password'])
+        prepared = {name: _coerce(columns[name], value) for name, value in row.items() if name in columns}
+        if model is Quiz and prepared.get('answer_key') is None:
+            prepared['answer_key'] = compile_answer_key(prepared.get('questions'))
+        yield prepared
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _column_defaults(table):
+    """``{column name: default value}`` for the table's Python-side scalar and callable defaults."""
+    defaults = {}
+    for column in table.columns:
+        default = column.default
+        if default is None or default.is_sequence or default.is_clause_element:
+            continue
+        defaults[column.name] = default.arg(None) if default.is_callable else default.arg
+    return defaults
+
+
+def _complete_batch(table, batch):
+    """Give every row of ``batch`` the same keys: the union of the batch's keys plus every
+    column with a Python-side default, filling omitted values from the column defaults.
+
+    Neither COPY nor an executemany INSERT applies these defaults for omitted keys,
+    and both need the same columns in every row.
+    """
+    defaults = _column_defaults(table)
+    keys = list(dict.fromkeys(key for row in batch for key in row))
+    keys += [key for key in defaults if key not in keys]
+    return [{key: row[key] if key in row else defaults.get(key) for key in keys} for row in batch]
+
+
+def _copy_batch(connection, table, batch):
+    # Postgres COPY from an in-memory CSV buffer; NULLs are written as unquoted empty fields
+    keys = list(batch[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow(['' if row.get(key) is None else json.dumps(row[key]) if isinstance(row[key], (dict, list)) else row[key]
+                         for key in keys])
+    buffer.seek(0)
+    columns = ', '.join(f'"{key}"' for key in keys)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY "{table.name}" ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def load_file(model, path, file_format=None, batch_size=5000, use_copy=False):
+    """Stream ``path`` into ``model``'s table in batches; returns ``(rows, seconds)``."""
+    table = model.__table__
+    use_copy = use_copy and db.engine.dialect.name == 'postgresql'
+    start = time.monotonic()
+    loaded = 0
+    with db.engine.begin() as connection:
+        for batch in _batches(prepare_rows(model, read_rows(path, file_format)), batch_size):
+            batch = _complete_batch(table, batch)
+            if use_copy:
+                _copy_batch(connection, table, batch)
+            else:
+                connection.execute(insert(table), batch)
+            loaded += len(batch)
+            if loaded % (batch_size * 20) == 0:
+                elapsed = time.monotonic() - start
+                logging.info(f"{table.name}: {loaded} rows, {loaded / elapsed:.0f} rows/s")
+        if db.engine.dialect.name == 'postgresql':
+            # Explicit ids bypass the serial sequence; move it past the loaded rows
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+                f"GREATEST((SELECT MAX(id) FROM \"{table.name}\"), 1))"
+            ))
+    return loaded, time.monotonic() - start
+
+
+def _data_files(directory):
+    for stem, model in TABLES.items():
+        for file_format in ('jsonl', 'csv'):
+            path = os.path.join(directory, f'{stem}.{file_format}')
+            if os.path.exists(path):
+                yield model, path, file_format
+
+
+def load(files, batch_size=5000, use_copy=False):
+    total_rows, total_seconds = 0, 0.0
+    with app.app_context():
+        for model, path, file_format in files:
+            rows, seconds = load_file(model, path, file_format, batch_size, use_copy)
+            total_rows += rows
+            total_seconds += seconds
+            print(f"{model.__tablename__:20} {rows:>10} rows in {seconds:7.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+            if model is UserCourse:
+                # Enrollment counters on user are maintained by the app's write paths, not by inserts
+                recount()
+                db.session.commit()
+    print(f"{'total':20} {total_rows:>10} rows in {total_seconds:7.1f}s ({total_rows / max(total_seconds, 1e-9):,.0f} rows/s)")
+
+
+class _Writer:
+    def __init__(self, path, file_format, fieldnames):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.file_format = file_format
+        self.csv = csv.DictWriter(self.file, fieldnames=fieldnames) if file_format == 'csv' else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, row):
+        row = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+        if self.csv:
+            self.csv.writerow({key: json.dumps(value) if isinstance(value, dict) else value for key, value in row.items()})
+        else:
+            self.file.write(json.dumps(row) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def generate(directory, users=10000, courses=200, enrollments_per_user=8, quizzes_per_course=3,
+             results_per_enrollment=1.5, file_format='jsonl', seed=42):
+    """Write synthetic courses, users, enrollments, quizzes and quiz results to ``directory``.
+
+    Course popularity follows a Zipf-like curve, each learner has a latent
+    ability that shapes both their progress and quiz scores, and study time
+    grows with the progress they've made.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.utcnow()
+
+    def writer(stem, fieldnames):
+        return _Writer(os.path.join(directory, f'{stem}.{file_format}'), file_format, fieldnames)
+
+    out = writer('courses', ['id', 'title', 'description', 'content'])
+    for course_id in range(1, courses + 1):
+        topic = TOPICS[course_id % len(TOPICS)]
+        title = f"{LEVELS[(course_id // len(TOPICS)) % len(LEVELS)]} {topic} {course_id}"
+        out.write({
+            'id': course_id,
+            'title': title[:120],
+            'description': f"Learn {topic.lower()} through lessons, exercises and quizzes.",
+            'content': f"# {title}\n\n## Lesson 1\n\nKey ideas of {topic}.\n\n## Lesson 2\n\nWorked examples and practice problems.\n",
+        })
+    out.close()
+
+    quiz_ids = {}
+    out = writer('quizzes', ['id', 'course_id', 'title', 'questions'])
+    quiz_id = 0
+    for course_id in range(1, courses + 1):
+        quiz_ids[course_id] = []
+        for number in range(1, quizzes_per_course + 1):
+            quiz_id += 1
+            quiz_ids[course_id].append(quiz_id)
+            out.write({'id': quiz_id, 'course_id': course_id, 'title': f"Course {course_id} Quiz {number}",
+                       'questions': {f"q{i}": {'text': f"Question {i} of quiz {number}",
+                                               'options': [f"Option {letter}" for letter in 'ABCD'],
+                                               'answer': rng.randrange(4)} for i in range(1, 6)}})
+    out.close()
+
+    # Zipf-like popularity: a few courses draw most enrollments
+    weights = [1 / rank ** 0.8 for rank in range(1, courses + 1)]
+    course_order = list(range(1, courses + 1))
+    rng.shuffle(course_order)
+
+    users_out = writer('users', ['id', 'username', 'email', 'password_hash', 'learning_style', 'last_login', 'total_study_time'])
+    enrollments_out = writer('enrollments', ['id', 'user_id', 'course_id', 'progress'])
+    results_out = writer('quiz_results', ['id', 'user_id', 'quiz_id', 'score'])
+    password_hash = generate_password_hash('password123')
+    enrollment_id = result_id = 0
+    for user_id in range(1, users + 1):
+        ability = rng.betavariate(2, 2)
+        n_courses = min(courses, max(1, int(rng.expovariate(1 / enrollments_per_user))))
+        taken = set()
+        while len(taken) < n_courses:
+            taken.update(rng.choices(course_order, weights=weights, k=n_courses - len(taken)))
+        total_progress = 0
+        for course_id in sorted(taken):
+            progress = min(100.0, max(0.0, rng.betavariate(1 + 3 * ability, 2) * 100))
+            total_progress += progress
+            enrollment_id += 1
+            enrollments_out.write({'id': enrollment_id, 'user_id': user_id, 'course_id': course_id, 'progress': round(progress, 2)})
+            for _ in range(int(results_per_enrollment * progress / 50 + rng.random())):
+                result_id += 1
+                score = min(100.0, max(0.0, rng.gauss(40 + 50 * ability, 12)))
+                results_out.write({'id': result_id, 'user_id': user_id, 'quiz_id': rng.choice(quiz_ids[course_id]), 'score': round(score, 1)})
+        users_out.write({
+            'id': user_id,
+            'username': f"learner{user_id}",
+            'email': f"learner{user_id}@example.com",
+            'password_hash': password_hash,
+            'learning_style': rng.choice(LEARNING_STYLES),
+            'last_login': now - timedelta(minutes=int(rng.expovariate(1 / (3 * 24 * 60)))),
+            'total_study_time': int(total_progress * rng.uniform(0.5, 3)),
+        })
+    for out in (users_out, enrollments_out, results_out):
+        out.close()
+    print(f"Wrote {courses} courses, {quiz_id} quizzes, {users} users, {enrollment_id} enrollments and {result_id} quiz results to {directory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load courses, users, enrollments, quizzes and quiz results, or generate synthetic data to load.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load_parser = subparsers.add_parser('load', help="load one file into a table, or every known file in a directory")
+    load_parser.add_argument('path', help=f"a directory containing {', '.join(TABLES)} .jsonl/.csv files, or a single file")
+    load_parser.add_argument('--table', choices=list(TABLES), help="target table when loading a single file (default: the file name)")
+    load_parser.add_argument('--format', choices=['jsonl', 'csv'], help="file format (default: the file extension)")
+    load_parser.add_argument('--batch-size', type=int, default=5000, help="rows per executemany/COPY batch")
+    load_parser.add_argument('--copy', action='store_true', help="use COPY FROM STDIN on PostgreSQL")
+
+    generate_parser = subparsers.add_parser('generate', help="write synthetic data files")
+    generate_parser.add_argument('directory')
+    generate_parser.add_argument('--users', type=int, default=10000)
+    generate_parser.add_argument('--courses', type=int, default=200)
+    generate_parser.add_argument('--enrollments-per-user', type=float, default=8, help="mean enrollments per user")
+    generate_parser.add_argument('--quizzes-per-course', type=int, default=3)
+    generate_parser.add_argument('--results-per-enrollment', type=float, default=1.5, help="mean quiz results per enrollment at 50%% progress")
+    generate_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    generate_parser.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        generate(args.directory, args.users, args.courses, args.enrollments_per_user, args.quizzes_per_course,
+                 args.results_per_enrollment, args.format, args.seed)
+    elif os.path.isdir(args.path):
+        load(_data_files(args.path), args.batch_size, args.copy)
+    else:
+        stem = args.table or os.path.splitext(os.path.basename(args.path))[0]
+        if stem not in TABLES:
+            sys.exit(f"Cannot tell which table {args.path} belongs to; pass --table")
+        load([(TABLES[stem], args.path, args.format)], args.batch_size, args.copy)
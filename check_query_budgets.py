@@ -0,0 +1,78 @@
+from main import app, db
+from models import Course, StudyGroup, ForumPost
+from services.course_panels import PANELS
+from flask import g, url_for
+import argparse
+import itertools
+import sys
+
+# Sample ids for the URL parameters of the budgeted routes
+SAMPLE_IDS = {
+    'course_id': Course,
+    'group_id': StudyGroup,
+    'post_id': ForumPost,
+}
+
+# Every value checked for the other URL parameters
+SAMPLE_VALUES = {
+    'panel': list(PANELS),
+}
+
+def budgeted_urls():
+    urls = []
+    with app.test_request_context():
+        for rule in app.url_map.iter_rules():
+            view = app.view_functions[rule.endpoint]
+            if getattr(view, 'query_budget', None) is None or 'GET' not in rule.methods:
+                continue
+            values = {}
+            for argument in sorted(rule.arguments):
+                if argument in SAMPLE_VALUES:
+                    values[argument] = SAMPLE_VALUES[argument]
+                    continue
+                model = SAMPLE_IDS.get(argument)
+                row = db.session.query(model.id).order_by(model.id).first() if model else None
+                if row is None:
+                    break
+                values[argument] = [row[0]]
+            else:
+                for combination in itertools.product(*values.values()):
+                    urls.append((rule.endpoint, url_for(rule.endpoint, **dict(zip(values, combination)))))
+    return sorted(urls)
+
+def check_query_budgets(username, password, repeat=2):
+    app.config['QUERY_BUDGET_STRICT'] = True
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+    # Measure course panels computed in the request, not handed over from the panel pool
+    app.config['PANEL_SPECULATIVE'] = False
+    failures = 0
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    if response.status_code not in (200, 302):
+        print(f"Login as {username} failed with status {response.status_code}")
+        return False
+
+    for endpoint, url in budgeted_urls():
+        budget = getattr(app.view_functions[endpoint], 'query_budget')
+        # The first request warms per-process caches; budgets apply to every request
+        for attempt in range(repeat):
+            with client:
+                try:
+                    response = client.get(url)
+                    _, used, _ = g.query_budget_used
+                    status = 'ok'
+                except AssertionError as e:
+                    used, status = str(e), 'OVER BUDGET'
+                    failures += 1
+            print(f"{status:12} {url:30} queries={used} budget={budget}")
+            if status != 'ok':
+                break
+    return failures == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request every route declared with @query_budget and fail if any issues more SQL statements than its budget.")
+    parser.add_argument('--username', default='alice', help="account to log in as (see add_sample_courses.py)")
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--repeat', type=int, default=2, help="requests per route")
+    args = parser.parse_args()
+    sys.exit(0 if check_query_budgets(args.username, args.password, args.repeat) else 1)
@@ -1,5 +1,93 @@
 import os
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 SECRET_KEY = os.urandom(32)
 SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool settings, applied to the primary and the replica
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+def engine_options(url):
+    options = {'pool_pre_ping': DB_POOL_PRE_PING, 'pool_recycle': DB_POOL_RECYCLE}
+    # SQLite uses a per-file (or per-thread, in memory) pool that takes no sizing
+    if url and not url.startswith('sqlite'):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    return options
+
+SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+# Optional read-only replica for recommendation, dashboard and listing reads
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+SQLALCHEMY_BINDS = {}
+if DATABASE_REPLICA_URL:
+    SQLALCHEMY_BINDS['replica'] = dict(engine_options(DATABASE_REPLICA_URL), url=DATABASE_REPLICA_URL)
+
+# Versioned model artifacts, trained with `python train_models.py train`
+MODEL_REGISTRY_PATH = os.environ.get('MODEL_REGISTRY_PATH', os.path.join(basedir, 'instance', 'models'))
+
+# Score difficulty with the flattened NumPy version of the gradient-boosted model
+DIFFICULTY_COMPILED_PREDICTOR = os.environ.get('DIFFICULTY_COMPILED_PREDICTOR', 'true').lower() in ('1', 'true', 'yes')
+
+# Persisted LSA embeddings used by content-based recommendations
+COURSE_INDEX_PATH = os.environ.get('COURSE_INDEX_PATH', os.path.join(basedir, 'instance', 'course_index'))
+
+# Item-item neighbor table used by collaborative filtering
+ITEM_SIMILARITY_TOP_K = int(os.environ.get('ITEM_SIMILARITY_TOP_K', 20))
+ITEM_SIMILARITY_REFRESH_SECONDS = int(os.environ.get('ITEM_SIMILARITY_REFRESH_SECONDS', 30))
+ITEM_SIMILARITY_MAX_AGE = int(os.environ.get('ITEM_SIMILARITY_MAX_AGE', 3600))
+
+# Precomputed recommendations older than this are recomputed live
+RECOMMENDATION_MAX_AGE = int(os.environ.get('RECOMMENDATION_MAX_AGE', 24 * 60 * 60))
+
+# Coalesce progress pings in memory and write them in batches every few seconds
+PROGRESS_WRITE_BEHIND = os.environ.get('PROGRESS_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+PROGRESS_FLUSH_SECONDS = float(os.environ.get('PROGRESS_FLUSH_SECONDS', 5))
+PROGRESS_BUFFER_MAX_KEYS = int(os.environ.get('PROGRESS_BUFFER_MAX_KEYS', 10000))
+
+# Course pages send a study-time heartbeat this often while visible; heartbeats
+# are counted per minute in memory and flushed to the database in batches
+STUDY_HEARTBEAT_SECONDS = int(os.environ.get('STUDY_HEARTBEAT_SECONDS', 30))
+STUDY_TIME_FLUSH_SECONDS = float(os.environ.get('STUDY_TIME_FLUSH_SECONDS', 60))
+STUDY_TIME_BUFFER_MAX_USERS = int(os.environ.get('STUDY_TIME_BUFFER_MAX_USERS', 10000))
+
+# Learning events are queued in memory and inserted in batches by a background thread
+EVENT_LOG_ENABLED = os.environ.get('EVENT_LOG_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+EVENT_BATCH_SIZE = int(os.environ.get('EVENT_BATCH_SIZE', 500))
+EVENT_FLUSH_SECONDS = float(os.environ.get('EVENT_FLUSH_SECONDS', 2))
+EVENT_QUEUE_MAX = int(os.environ.get('EVENT_QUEUE_MAX', 100000))
+
+# Course pages render without the personalization panels, which the page loads
+# as JSON; they start computing on a local thread pool when the page is requested
+PANEL_SPECULATIVE = os.environ.get('PANEL_SPECULATIVE', 'true').lower() in ('1', 'true', 'yes')
+PANEL_WORKERS = int(os.environ.get('PANEL_WORKERS', 4))
+PANEL_RESULT_TTL = float(os.environ.get('PANEL_RESULT_TTL', 60))
+PANEL_MAX_PENDING = int(os.environ.get('PANEL_MAX_PENDING', 1000))
+PANEL_WAIT_SECONDS = float(os.environ.get('PANEL_WAIT_SECONDS', 10))
+
+# Posts per forum page (the JSON endpoint accepts ?limit= up to 100)
+FORUM_PAGE_SIZE = int(os.environ.get('FORUM_PAGE_SIZE', 20))
+
+# Study groups per listing page
+STUDY_GROUP_PAGE_SIZE = int(os.environ.get('STUDY_GROUP_PAGE_SIZE', 20))
+
+# Offline actions accepted per /api/sync request, and how far before the client's
+# cursor course changes are re-sent (covers edits committed out of timestamp order)
+SYNC_MAX_ACTIONS = int(os.environ.get('SYNC_MAX_ACTIONS', 500))
+SYNC_CURSOR_OVERLAP_SECONDS = int(os.environ.get('SYNC_CURSOR_OVERLAP_SECONDS', 5))
+
+# Fingerprinted, precompressed static files written by build_assets.py
+ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR', os.path.join(basedir, 'static', 'dist'))
+ASSET_MANIFEST_PATH = os.path.join(ASSET_BUILD_DIR, 'assets.json')
+
+# gzip HTML and JSON responses of at least COMPRESS_MIN_SIZE bytes
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+# Rendered adapted-content variants kept in memory per process (at most 12 per course)
+ADAPTED_CONTENT_CACHE_SIZE = int(os.environ.get('ADAPTED_CONTENT_CACHE_SIZE', 4096))
@@ -1,3 +1,39 @@
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-db = SQLAlchemy()
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """Sends reads to the read replica inside ``read_replica()`` blocks.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary,
+    as does everything when no replica is configured.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('use_replica') and not self._flushing and not getattr(clause, 'is_dml', False):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+@contextmanager
+def read_replica():
+    """Route the queries issued in this block to the read replica, if one is configured.
+
+    Results may lag the primary by the replication delay, so only use it for
+    reads that tolerate that (recommendations, listings, dashboards).
+    """
+    session = db.session()
+    previous = session.info.get('use_replica', False)
+    session.info['use_replica'] = True
+    try:
+        yield session
+    finally:
+        session.info['use_replica'] = previous
@@ -1,7 +1,9 @@
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from database import db
+from services.query_budget import init_query_counting
+from services.assets import init_assets, send_asset, service_worker_response
 import logging
 import markdown2 
 from markupsafe import Markup
@@ -14,6 +16,8 @@ app.config.from_object('config')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 db.init_app(app)
+init_query_counting(app)
+init_assets(app)
 migrate = Migrate(app, db)
 login_manager = LoginManager(app)
 login_manager.login_view = 'auth.login'
@@ -24,12 +28,13 @@ from models import User
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-from routes import auth, courses, user, peer_learning
+from routes import auth, courses, user, peer_learning, api
 
 app.register_blueprint(auth.bp)
 app.register_blueprint(courses.bp)
 app.register_blueprint(user.bp)
 app.register_blueprint(peer_learning.bp)
+app.register_blueprint(api.bp)
 
 @app.route('/')
 def index():
@@ -41,11 +46,11 @@ def offline():
 
 @app.route('/static/js/service-worker.js')
 def serve_service_worker():
-    return send_from_directory(app.static_folder, 'js/service-worker.js', mimetype='application/javascript')
+    return service_worker_response()
 
 @app.route('/manifest.json')
 def serve_manifest():
-    return send_from_directory(app.static_folder, 'manifest.json', mimetype='application/json')
+    return send_asset('manifest.json')
 
 @app.template_filter('markdown')
 def markdown_filter(text):
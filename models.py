@@ -1,5 +1,7 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import case, event, exists, func, or_, select
+from sqlalchemy.ext.hybrid import hybrid_method
 from database import db
 from datetime import datetime, timedelta
 
@@ -13,6 +15,9 @@ class User(UserMixin, db.Model):
     quiz_results = db.relationship('UserQuizResult', back_populates='user')
     last_login = db.Column(db.DateTime, default=datetime.utcnow)
     total_study_time = db.Column(db.Integer, default=0)  # in minutes
+    # Maintained by services.progress_service alongside every user_course write
+    enrollment_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    progress_sum = db.Column(db.Float, default=0.0, server_default='0', nullable=False)
     study_groups = db.relationship('StudyGroup', secondary='user_study_group', back_populates='members')
     forum_posts = db.relationship('ForumPost', back_populates='author')
 
@@ -22,40 +27,69 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @hybrid_method
     def average_performance(self):
-        if not self.user_courses:
-            return 0
-        return sum(uc.progress for uc in self.user_courses) / len(self.user_courses)
+        return User.compute_average_performance(self.enrollment_count, self.progress_sum)
+
+    @average_performance.expression
+    def average_performance(cls):
+        return case((cls.enrollment_count > 0, cls.progress_sum / cls.enrollment_count), else_=0)
 
     def engagement_score(self):
-        if not self.user_courses or self.last_login is None:
+        return User.compute_engagement_score(self.enrollment_count, self.total_study_time, self.last_login)
+
+    @hybrid_method
+    def learning_pace(self):
+        return User.compute_learning_pace(self.enrollment_count, self.progress_sum, self.total_study_time)
+
+    @learning_pace.expression
+    def learning_pace(cls):
+        # progress per hour / 10, averaged with performance and clamped to [0, 1]
+        adjusted = (cls.progress_sum * 6.0 / cls.total_study_time + cls.average_performance()) / 2
+        return case(
+            (or_(cls.enrollment_count == 0, func.coalesce(cls.total_study_time, 0) == 0), 0.5),
+            (adjusted < 0, 0.0),
+            (adjusted > 1, 1.0),
+            else_=adjusted,
+        )
+
+    @staticmethod
+    def compute_average_performance(enrollment_count, progress_sum):
+        if not enrollment_count:
+            return 0
+        return progress_sum / enrollment_count
+
+    @staticmethod
+    def compute_engagement_score(enrollment_count, total_study_time, last_login):
+        if not enrollment_count or last_login is None:
             return 0
         
-        days_since_login = (datetime.utcnow() - self.last_login).days + 1
-        login_frequency = len(self.user_courses) / days_since_login
+        days_since_login = (datetime.utcnow() - last_login).days + 1
+        login_frequency = enrollment_count / days_since_login
         
         max_study_time = days_since_login * 4 * 60
-        normalized_study_time = min(self.total_study_time / max_study_time, 1)
+        normalized_study_time = min(total_study_time / max_study_time, 1)
         
         engagement = (0.5 * login_frequency) + (0.5 * normalized_study_time)
         return min(engagement, 1)
 
-    def learning_pace(self):
-        if not self.user_courses or not self.total_study_time:
+    @staticmethod
+    def compute_learning_pace(enrollment_count, progress_sum, total_study_time):
+        if not enrollment_count or not total_study_time:
             return 0.5
         
-        total_progress = sum(uc.progress for uc in self.user_courses)
-        progress_per_hour = total_progress / (self.total_study_time / 60)
+        progress_per_hour = progress_sum / (total_study_time / 60)
         
         normalized_pace = progress_per_hour / 10
         
-        performance_factor = self.average_performance()
+        performance_factor = User.compute_average_performance(enrollment_count, progress_sum)
         adjusted_pace = (normalized_pace + performance_factor) / 2
         
         return min(max(adjusted_pace, 0), 1)
 
     def update_study_time(self, minutes):
-        self.total_study_time += minutes
+        from services.progress_service import add_study_time
+        add_study_time(self.id, minutes)
         db.session.commit()
 
 class Course(db.Model):
@@ -63,12 +97,19 @@ class Course(db.Model):
     title = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text)
     content = db.Column(db.Text)
+    content_html = db.Column(db.Text)  # sanitized render of `content`, refreshed on every write
+    # Bumped on every edit; the JSON API's ETags are derived from it
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_courses = db.relationship('UserCourse', back_populates='course')
     quizzes = db.relationship('Quiz', back_populates='course')
     study_groups = db.relationship('StudyGroup', back_populates='course')
     forum_posts = db.relationship('ForumPost', back_populates='course')
 
 class UserCourse(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_course_user_id_course_id', 'user_id', 'course_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
@@ -76,15 +117,99 @@ class UserCourse(db.Model):
     user = db.relationship('User', back_populates='user_courses')
     course = db.relationship('Course', back_populates='user_courses')
 
-class Quiz(db.Model):
+class UserRecommendation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class StudyMinute(db.Model):
+    # One row per epoch minute a user studied; total_study_time counts each row once
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    minute = db.Column(db.Integer, primary_key=True)
+    # Not a foreign key: heartbeats aren't checked against the catalog and deleted courses keep their minutes
+    course_id = db.Column(db.Integer)
+
+class LearningEvent(db.Model):
+    # Append-only; written in batches by services.event_log
+    __table_args__ = (
+        db.Index('ix_learning_event_course_id_event_type_created_at', 'course_id', 'event_type', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'))
+    event_type = db.Column(db.String(32), nullable=False)
+    value = db.Column(db.Float)
+    payload = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class CourseEventRollup(db.Model):
+    # Running per-course totals, incremented as learning events are flushed
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), primary_key=True)
+    view_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    progress_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    feedback_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    difficulty_total = db.Column(db.Float, default=0.0, server_default='0', nullable=False)
+    difficulty_ratings = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    engagement_total = db.Column(db.Float, default=0.0, server_default='0', nullable=False)
+    engagement_ratings = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    quiz_submission_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    quiz_score_total = db.Column(db.Float, default=0.0, server_default='0', nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def average_difficulty(self):
+        return self.difficulty_total / self.difficulty_ratings if self.difficulty_ratings else None
+
+    def average_engagement(self):
+        return self.engagement_total / self.engagement_ratings if self.engagement_ratings else None
+
+    def average_quiz_score(self):
+        return self.quiz_score_total / self.quiz_submission_count if self.quiz_submission_count else None
+
+class SyncAction(db.Model):
+    # Offline actions applied through /api/sync, keyed by the client's idempotency key
+    __table_args__ = (
+        db.Index('ix_sync_action_user_id_key', 'user_id', 'key', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    action_type = db.Column(db.String(32), nullable=False)
+    payload = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Quiz(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
     title = db.Column(db.String(120), nullable=False)
     questions = db.Column(db.JSON)
+    # Compiled from `questions` on every save; see services.quiz_engine
+    answer_key = db.Column(db.JSON)
     course = db.relationship('Course', back_populates='quizzes')
     user_results = db.relationship('UserQuizResult', back_populates='quiz')
 
+@event.listens_for(Quiz, 'before_insert')
+@event.listens_for(Quiz, 'before_update')
+def compile_quiz_answer_key(mapper, connection, quiz):
+    from services.quiz_engine import compile_answer_key
+    quiz.answer_key = compile_answer_key(quiz.questions)
+
+class QuizQuestionStat(db.Model):
+    # Running per-question totals, incremented as submissions are graded
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    question_id = db.Column(db.String(64), primary_key=True)
+    attempts = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    correct = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    def correct_rate(self):
+        return self.correct / self.attempts if self.attempts else None
+
 class UserQuizResult(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_quiz_result_user_id_quiz_id', 'user_id', 'quiz_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
@@ -93,25 +218,45 @@ class UserQuizResult(db.Model):
     quiz = db.relationship('Quiz', back_populates='user_results')
 
 class StudyGroup(db.Model):
+    __table_args__ = (
+        db.Index('ix_study_group_course_id_created_at_id', 'course_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     course = db.relationship('Course', back_populates='study_groups')
     members = db.relationship('User', secondary='user_study_group', back_populates='study_groups')
 
+    @staticmethod
+    def membership_exists(user_id, group_id):
+        return exists().where(UserStudyGroup.user_id == user_id, UserStudyGroup.study_group_id == group_id)
+
+    @staticmethod
+    def member_count_of(group_id):
+        return select(func.count(UserStudyGroup.id)).where(UserStudyGroup.study_group_id == group_id).scalar_subquery()
+
+    def has_member(self, user_id):
+        return db.session.query(StudyGroup.membership_exists(user_id, self.id)).scalar()
+
 class UserStudyGroup(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_study_group_user_id_study_group_id', 'user_id', 'study_group_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    study_group_id = db.Column(db.Integer, db.ForeignKey('study_group.id'), nullable=False)
+    study_group_id = db.Column(db.Integer, db.ForeignKey('study_group.id'), nullable=False, index=True)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class ForumPost(db.Model):
+    __table_args__ = (
+        db.Index('ix_forum_post_course_id_created_at_id', 'course_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(120), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
@@ -125,6 +270,6 @@ class ForumReply(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('forum_post.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('forum_post.id'), nullable=False, index=True)
     author = db.relationship('User')
     post = db.relationship('ForumPost', back_populates='replies')
\ No newline at end of file
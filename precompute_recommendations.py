@@ -0,0 +1,61 @@
+from main import app, db
+from database import read_replica
+from models import User, UserRecommendation
+from services.ai_service import hybrid_recommendations_batch
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import insert
+import argparse
+import logging
+import os
+import time
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused after fork
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def _recommend_chunk(args):
+    user_ids, top_n = args
+    with app.app_context(), read_replica():
+        return hybrid_recommendations_batch(user_ids, top_n)
+
+def _store_chunk(recommendations, generated_at):
+    user_ids = list(recommendations)
+    UserRecommendation.query.filter(UserRecommendation.user_id.in_(user_ids)).delete(synchronize_session=False)
+    rows = [
+        {'user_id': user_id, 'course_id': course_id, 'rank': rank, 'generated_at': generated_at}
+        for user_id, course_ids in recommendations.items()
+        for rank, course_id in enumerate(course_ids)
+    ]
+    if rows:
+        db.session.execute(insert(UserRecommendation), rows)
+    db.session.commit()
+
+def precompute_recommendations(top_n=5, workers=None, chunk_size=500):
+    start = time.monotonic()
+    with app.app_context():
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+        chunks = [(user_ids[i:i + chunk_size], top_n) for i in range(0, len(user_ids), chunk_size)]
+        generated_at = datetime.utcnow()
+        for engine in db.engines.values():
+            engine.dispose()
+
+        processed = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for recommendations in pool.map(_recommend_chunk, chunks):
+                _store_chunk(recommendations, generated_at)
+                processed += len(recommendations)
+                logging.info(f"Stored recommendations for {processed}/{len(user_ids)} users")
+
+    elapsed = time.monotonic() - start
+    print(f"Precomputed top-{top_n} recommendations for {len(user_ids)} users in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute hybrid course recommendations for every user.")
+    parser.add_argument('--top-n', type=int, default=5, help="recommendations stored per user")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--chunk-size', type=int, default=500, help="users scored per worker task")
+    args = parser.parse_args()
+    precompute_recommendations(args.top_n, args.workers, args.chunk_size)
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from models import Course, UserCourse
+from database import db, read_replica
+from services.ai_service import get_item_similarity_cache
+from services.query_budget import query_budget
+from services.sync_service import apply_sync_actions
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# Selectable with ?fields=; the ETag covers the selected fields, so clients that
+# ask for different fields never share a cached copy
+COURSE_FIELDS = ('id', 'title', 'description', 'content', 'content_html', 'version', 'updated_at')
+CATALOG_DEFAULT_FIELDS = ('id', 'title', 'description', 'version', 'updated_at')
+COURSE_DEFAULT_FIELDS = COURSE_FIELDS + ('progress',)
+
+def _selected_fields(allowed, default):
+    """Fields named in ``?fields=``, or ``default``; raises ValueError on unknown names."""
+    requested = request.args.get('fields')
+    if not requested:
+        return default
+    fields = tuple(dict.fromkeys(field.strip() for field in requested.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def _etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def _conditional(etag, build_body):
+    """304 if the client already has ``etag``, otherwise the JSON from ``build_body()``."""
+    # Weak comparison: compress_response weakens the ETag of gzipped bodies
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build_body())
+    response.set_etag(etag)
+    # Per-user data behind a login: only the browser may cache it, and must revalidate
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _course_json(row, fields):
+    course = {}
+    for field in fields:
+        value = getattr(row, field)
+        course[field] = value.isoformat() if field == 'updated_at' and value is not None else value
+    return course
+
+@bp.route('/courses')
+@login_required
+@query_budget(2)
+def courses():
+    try:
+        fields = _selected_fields(COURSE_FIELDS, CATALOG_DEFAULT_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with read_replica():
+        # Narrow (id, version) scan for the ETag; course bodies are only read on a miss
+        versions = db.session.execute(select(Course.id, Course.version).order_by(Course.id)).all()
+        etag = _etag('courses', fields, [tuple(row) for row in versions])
+
+        def build_body():
+            columns = [getattr(Course, field) for field in fields]
+            rows = db.session.execute(select(*columns).order_by(Course.id)).all()
+            return [_course_json(row, fields) for row in rows]
+
+        return _conditional(etag, build_body)
+
+@bp.route('/courses/<int:course_id>')
+@login_required
+@query_budget(3)
+def course(course_id):
+    try:
+        fields = _selected_fields(COURSE_DEFAULT_FIELDS, COURSE_DEFAULT_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    version = db.session.execute(select(Course.version).where(Course.id == course_id)).scalar()
+    if version is None:
+        return jsonify({'error': 'Course not found'}), 404
+    progress = None
+    if 'progress' in fields:
+        progress = db.session.execute(
+            select(UserCourse.progress).where(UserCourse.user_id == current_user.id, UserCourse.course_id == course_id)
+        ).scalar()
+    etag = _etag('course', course_id, version, fields, progress)
+    course_fields = [field for field in fields if field != 'progress']
+
+    def build_body():
+        body = {}
+        if course_fields:
+            columns = [getattr(Course, field) for field in course_fields]
+            body = _course_json(db.session.execute(select(*columns).where(Course.id == course_id)).one(), course_fields)
+        if 'progress' in fields:
+            body['progress'] = progress
+        return body
+
+    return _conditional(etag, build_body)
+
+def _course_changes(cursor):
+    """Catalog entries changed since ``cursor`` plus every current course id, so clients can drop deleted ones."""
+    now = datetime.utcnow()
+    statement = select(*[getattr(Course, field) for field in CATALOG_DEFAULT_FIELDS]).order_by(Course.id)
+    if cursor is not None:
+        overlap = timedelta(seconds=current_app.config['SYNC_CURSOR_OVERLAP_SECONDS'])
+        statement = statement.where(Course.updated_at > cursor - overlap)
+    return {
+        'changed': [_course_json(row, CATALOG_DEFAULT_FIELDS) for row in db.session.execute(statement)],
+        'ids': list(db.session.scalars(select(Course.id).order_by(Course.id))),
+        'cursor': now.isoformat(),
+    }
+
+@bp.route('/sync', methods=['POST'])
+@login_required
+@query_budget(13)
+def sync():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    actions = data.get('actions') or []
+    if not isinstance(actions, list) or len(actions) > current_app.config['SYNC_MAX_ACTIONS']:
+        return jsonify({'error': f"actions must be a list of at most {current_app.config['SYNC_MAX_ACTIONS']} items"}), 400
+    try:
+        cursor = datetime.fromisoformat(data['cursor']) if data.get('cursor') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    try:
+        results, progress = apply_sync_actions(current_user.id, actions)
+        db.session.commit()
+    except IntegrityError:
+        # Another request recorded some of these keys first; they now replay as duplicates
+        db.session.rollback()
+        results, progress = apply_sync_actions(current_user.id, actions)
+        db.session.commit()
+
+    try:
+        cache = get_item_similarity_cache()
+        for (user_id, course_id), value in progress.items():
+            cache.record_progress(user_id, course_id, value)
+    except Exception as e:
+        logging.error(f"Error recording synced progress in item similarity cache: {str(e)}")
+
+    return jsonify({'results': results, 'courses': _course_changes(cursor)})
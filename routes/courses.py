@@ -1,61 +1,84 @@
 import logging
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash
+from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash, current_app, make_response
 from flask_login import login_required, current_user
-from models import Course, UserCourse, User, Quiz, UserQuizResult, StudyGroup
-from services.ai_service import personalize_content, hybrid_recommendations, dynamic_difficulty_adjustment
-from database import db
+from models import Course, UserCourse, User, Quiz, UserQuizResult, StudyGroup, UserRecommendation, LearningEvent, CourseEventRollup
+from services.ai_service import precomputed_or_live_recommendations, dynamic_difficulty_adjustment_batch, get_course_index, get_item_similarity_cache, load_user_features, get_adapted_content_cache, catalog_courses
+from services.query_budget import query_budget
+from database import db, read_replica
 import numpy as np
-import markdown2
+from services.content_service import render_course_html
+from services.progress_service import enroll_once, increment_progress, get_progress_buffer, record_heartbeat
+from services.event_log import record_event
+from services.course_panels import PANELS, get_panel_pool, panel_result
+from services.quiz_engine import compiled_quizzes, grade_submissions, public_questions
 
 bp = Blueprint('courses', __name__)
 
+def _update_course_index(course):
+    try:
+        get_course_index().upsert([course])
+    except Exception as e:
+        logging.error(f"Error updating course index for course {course.id}: {str(e)}")
+
+def _record_progress(user_id, course_id, progress):
+    try:
+        get_item_similarity_cache().record_progress(user_id, course_id, progress)
+    except Exception as e:
+        logging.error(f"Error recording progress in item similarity cache: {str(e)}")
+
 @bp.route('/courses')
 @login_required
+@query_budget(6)
 def course_list():
-    courses = Course.query.all()
-    all_users = User.query.all()
+    with read_replica():
+        courses = catalog_courses()
+        features = load_user_features(current_user)
+        try:
+            recommended_courses = precomputed_or_live_recommendations(current_user, courses, features=features)
+        except Exception as e:
+            logging.error(f"Error in course recommendations: {str(e)}")
+            recommended_courses = []
     try:
-        recommended_courses = hybrid_recommendations(current_user, courses, all_users)
+        difficulties = dynamic_difficulty_adjustment_batch(current_user, features=features)
     except Exception as e:
-        logging.error(f"Error in hybrid_recommendations: {str(e)}")
-        recommended_courses = []
-    return render_template('course_list.html', courses=courses, recommended_courses=recommended_courses)
+        logging.error(f"Error in dynamic difficulty adjustment: {str(e)}")
+        difficulties = {}
+    return render_template('course_list.html', courses=courses, recommended_courses=recommended_courses, difficulties=difficulties)
 
 @bp.route('/courses/<int:course_id>')
 @login_required
+@query_budget(8)
 def course_detail(course_id):
     logging.info(f"Accessing course detail for course_id: {course_id}, user_id: {current_user.id}")
     course = Course.query.get_or_404(course_id)
     user_course = UserCourse.query.filter_by(user_id=current_user.id, course_id=course_id).first()
     
     if not user_course:
-        user_course = UserCourse(user_id=current_user.id, course_id=course_id, progress=0)
-        db.session.add(user_course)
-        db.session.commit()
+        user_course, created = enroll_once(current_user.id, course_id)
+        if created:
+            db.session.commit()
+            _record_progress(current_user.id, course_id, user_course.progress)
+    record_event(current_user.id, course_id, 'view')
+    # The page loads its personalization panels as JSON; start computing them now
+    if current_app.config['PANEL_SPECULATIVE']:
+        get_panel_pool().speculate(current_user.id, course_id, load_user_features(current_user))
     
-    course_content = {
-        'course_id': course.id,
-        'title': course.title,
-        'content': markdown2.markdown(course.content, extras=['fenced-code-blocks', 'tables']),
-    }
-    logging.info(f"Course content prepared: {course_content}")
-    
-    personalized_content = personalize_content(current_user, course_content)
-    logging.info(f"Personalized content received for user {current_user.id} and course {course_id}")
-    
-    all_users = User.query.all()
-    all_courses = Course.query.all()
-    recommended_courses = hybrid_recommendations(current_user, all_courses, all_users)
-    
-    adjusted_difficulty = dynamic_difficulty_adjustment(current_user, course_id)
-    logging.info(f"Dynamically adjusted difficulty for user {current_user.id} and course {course_id}: {adjusted_difficulty}")
+    content_html = course.content_html
+    if content_html is None:
+        content_html = render_course_html(course.content)
     
     return render_template('course_detail.html', 
                            course=course, 
-                           personalized_content=personalized_content, 
-                           user_progress=user_course.progress,
-                           recommended_courses=recommended_courses,
-                           adjusted_difficulty=adjusted_difficulty)
+                           content_html=content_html, 
+                           user_progress=user_course.progress)
+
+@bp.route('/courses/<int:course_id>/panels/<panel>')
+@login_required
+@query_budget(4)
+def course_panel(course_id, panel):
+    if panel not in PANELS:
+        return jsonify({'error': 'Unknown panel'}), 404
+    return jsonify(panel_result(current_user, course_id, panel))
 
 @bp.route('/courses/create', methods=['GET', 'POST'])
 @login_required
@@ -65,9 +88,10 @@ def create_course():
         description = request.form.get('description')
         content = request.form.get('content')
         
-        new_course = Course(title=title, description=description, content=content)
+        new_course = Course(title=title, description=description, content=content, content_html=render_course_html(content))
         db.session.add(new_course)
         db.session.commit()
+        _update_course_index(new_course)
         
         flash('Course created successfully!', 'success')
         return redirect(url_for('courses.course_detail', course_id=new_course.id))
@@ -83,8 +107,12 @@ def edit_course(course_id):
         course.title = request.form.get('title')
         course.description = request.form.get('description')
         course.content = request.form.get('content')
+        course.content_html = render_course_html(course.content)
+        course.version = Course.version + 1
         
         db.session.commit()
+        _update_course_index(course)
+        get_adapted_content_cache().invalidate_course(course.id)
         flash('Course updated successfully!', 'success')
         return redirect(url_for('courses.course_detail', course_id=course.id))
     
@@ -97,23 +125,90 @@ def delete_course(course_id):
     
     # Delete associated study groups
     StudyGroup.query.filter_by(course_id=course_id).delete()
+    UserRecommendation.query.filter_by(course_id=course_id).delete()
+    LearningEvent.query.filter_by(course_id=course_id).delete()
+    CourseEventRollup.query.filter_by(course_id=course_id).delete()
     
     db.session.delete(course)
     db.session.commit()
+    try:
+        get_course_index().remove(course_id)
+    except Exception as e:
+        logging.error(f"Error removing course {course_id} from course index: {str(e)}")
+    get_adapted_content_cache().invalidate_course(course_id)
     flash('Course deleted successfully!', 'success')
     return redirect(url_for('courses.course_list'))
 
 @bp.route('/courses/<int:course_id>/update_progress', methods=['POST'])
 @login_required
 def update_progress(course_id):
-    user_course = UserCourse.query.filter_by(user_id=current_user.id, course_id=course_id).first()
-    
-    if user_course:
-        user_course.progress = min(user_course.progress + 10, 100)
-        db.session.commit()
-        return jsonify({'success': True, 'progress': user_course.progress})
+    if current_app.config['PROGRESS_WRITE_BEHIND']:
+        stored = db.session.query(UserCourse.progress).filter_by(user_id=current_user.id, course_id=course_id).first()
+        if stored is None:
+            return jsonify({'success': False}), 404
+        progress_buffer = get_progress_buffer()
+        progress_buffer.add(current_user.id, course_id, 10)
+        # Stored value plus this process's unflushed pings, as the next flush will write it
+        progress = min(max((stored.progress or 0) + progress_buffer.pending_delta(current_user.id, course_id), 0), 100)
+        record_event(current_user.id, course_id, 'progress', 10, progress=progress)
+        return jsonify({'success': True, 'progress': progress})
     
-    return jsonify({'success': False}), 404
+    progress = increment_progress(current_user.id, course_id, 10)
+    if progress is None:
+        return jsonify({'success': False}), 404
+    db.session.commit()
+    _record_progress(current_user.id, course_id, progress)
+    record_event(current_user.id, course_id, 'progress', 10, progress=progress)
+    return jsonify({'success': True, 'progress': progress})
+
+@bp.route('/courses/<int:course_id>/heartbeat', methods=['POST'])
+@login_required
+@query_budget(0)
+def study_heartbeat(course_id):
+    # Buffered per user and minute; flushed to study_minute and total_study_time in batches
+    record_heartbeat(current_user.id, course_id)
+    return jsonify({'success': True})
+
+@bp.route('/courses/<int:course_id>/quiz')
+@login_required
+@query_budget(1)
+def course_quiz(course_id):
+    # Browsers navigating here get the quiz page, which loads this route as JSON
+    if request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'text/html':
+        response = make_response(render_template('quiz.html', course_id=course_id))
+        response.vary.add('Accept')
+        return response
+    quiz_query = Quiz.query.filter_by(course_id=course_id)
+    quiz_id = request.args.get('quiz_id', type=int)
+    quiz = (quiz_query.filter_by(id=quiz_id) if quiz_id else quiz_query.order_by(Quiz.id)).first()
+    if quiz is None:
+        return jsonify({'error': 'Quiz not found'}), 404
+    response = jsonify({
+        'id': quiz.id,
+        'course_id': quiz.course_id,
+        'title': quiz.title,
+        'questions': public_questions(quiz.questions),
+    })
+    response.vary.add('Accept')
+    return response
+
+@bp.route('/courses/<int:course_id>/quiz/submit', methods=['POST'])
+@login_required
+@query_budget(5)
+def submit_quiz(course_id):
+    data = request.get_json(silent=True) or {}
+    quiz_id = data.get('quiz_id')
+    answers = data.get('answers')
+    if not isinstance(quiz_id, int) or not isinstance(answers, dict):
+        return jsonify({'success': False, 'error': 'Expected quiz_id and an answers object'}), 400
+    quizzes = compiled_quizzes([quiz_id])
+    if quiz_id not in quizzes or quizzes[quiz_id].course_id != course_id:
+        return jsonify({'success': False, 'error': 'Quiz not found'}), 404
+    # Free-text quizzes are accepted without a score
+    score = grade_submissions([(current_user.id, quiz_id, answers)], quizzes)[0]
+    db.session.commit()
+    progress = db.session.query(UserCourse.progress).filter_by(user_id=current_user.id, course_id=course_id).scalar()
+    return jsonify({'success': True, 'score': score, 'graded': score is not None, 'progress': progress or 0})
 
 @bp.route('/courses/<int:course_id>/submit_feedback', methods=['POST'])
 @login_required
@@ -123,8 +218,7 @@ def submit_feedback(course_id):
     engagement = data.get('engagement')
     feedback = data.get('feedback')
     
-    # Here you would typically store this feedback in the database
-    # For now, we'll just log it
     logging.info(f"Feedback received for course {course_id}: Difficulty: {difficulty}, Engagement: {engagement}, Feedback: {feedback}")
+    record_event(current_user.id, course_id, 'feedback', difficulty=difficulty, engagement=engagement, feedback=feedback)
     
     return jsonify({'success': True})
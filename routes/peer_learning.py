@@ -1,15 +1,57 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, current_app
 from flask_login import login_required, current_user
-from models import db, StudyGroup, UserStudyGroup, ForumPost, ForumReply, Course
+from models import db, StudyGroup, UserStudyGroup, ForumPost, ForumReply, Course, User
+from database import read_replica
 from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from services.pagination import keyset_page, split_page
+from services.query_budget import query_budget
+from services.progress_service import UPSERT_INSERTS
 
 bp = Blueprint('peer_learning', __name__)
 
+# Members listed on a study group's page; the full count is always shown
+STUDY_GROUP_MEMBERS_SHOWN = 100
+
+def _page_args(page_size_setting):
+    page_size = current_app.config[page_size_setting]
+    limit = min(max(request.args.get('limit', page_size, type=int), 1), 100)
+    return request.args.get('course_id', type=int), request.args.get('cursor'), limit
+
+def _study_group_page(user_id, course_id, cursor, limit):
+    page = select(StudyGroup.id, StudyGroup.created_at)
+    if course_id:
+        page = page.where(StudyGroup.course_id == course_id)
+    page = keyset_page(page, StudyGroup.created_at, StudyGroup.id, cursor, limit).subquery()
+    statement = select(
+        StudyGroup.id,
+        StudyGroup.name,
+        StudyGroup.description,
+        StudyGroup.course_id,
+        StudyGroup.created_at,
+        Course.title.label('course_title'),
+        StudyGroup.member_count_of(StudyGroup.id).label('member_count'),
+        StudyGroup.membership_exists(user_id, StudyGroup.id).label('is_member'),
+    ).join(page, page.c.id == StudyGroup.id).outerjoin(
+        Course, StudyGroup.course_id == Course.id
+    ).order_by(StudyGroup.created_at.desc(), StudyGroup.id.desc())
+    return split_page(db.session.execute(statement), limit)
+
 @bp.route('/study_groups')
 @login_required
+@query_budget(2)
 def study_groups():
-    study_groups = StudyGroup.query.all()
-    return render_template('study_groups.html', study_groups=study_groups)
+    course_id, cursor, limit = _page_args('STUDY_GROUP_PAGE_SIZE')
+    with read_replica():
+        try:
+            study_groups, next_cursor = _study_group_page(current_user.id, course_id, cursor, limit)
+        except ValueError:
+            abort(400)
+        courses = db.session.query(Course.id, Course.title).order_by(Course.title).all()
+    return render_template('study_groups.html', study_groups=study_groups, next_cursor=next_cursor,
+                           courses=courses, course_id=course_id, limit=limit)
 
 @bp.route('/study_groups/create', methods=['GET', 'POST'])
 @login_required
@@ -36,11 +78,24 @@ def create_study_group():
 @bp.route('/study_groups/<int:group_id>/join')
 @login_required
 def join_study_group(group_id):
-    study_group = StudyGroup.query.get_or_404(group_id)
-    if current_user not in study_group.members:
-        user_group = UserStudyGroup(user_id=current_user.id, study_group_id=group_id)
-        db.session.add(user_group)
+    StudyGroup.query.get_or_404(group_id)
+    # A double click or a second tab must not trip the unique (user_id, study_group_id) index
+    upsert = UPSERT_INSERTS.get(db.session.get_bind(UserStudyGroup.__mapper__).dialect.name)
+    if upsert is not None:
+        statement = upsert(UserStudyGroup).values(user_id=current_user.id, study_group_id=group_id).on_conflict_do_nothing(
+            index_elements=['user_id', 'study_group_id']
+        ).returning(UserStudyGroup.id)
+        joined = db.session.execute(statement).scalar_one_or_none() is not None
         db.session.commit()
+    else:
+        try:
+            db.session.add(UserStudyGroup(user_id=current_user.id, study_group_id=group_id))
+            db.session.commit()
+            joined = True
+        except IntegrityError:
+            db.session.rollback()
+            joined = False
+    if joined:
         flash('You have joined the study group!', 'success')
     else:
         flash('You are already a member of this study group.', 'info')
@@ -48,15 +103,81 @@ def join_study_group(group_id):
 
 @bp.route('/study_groups/<int:group_id>')
 @login_required
+@query_budget(3)
 def study_group_detail(group_id):
-    study_group = StudyGroup.query.get_or_404(group_id)
-    return render_template('study_group_detail.html', study_group=study_group)
+    study_group = StudyGroup.query.options(joinedload(StudyGroup.course)).get_or_404(group_id)
+    member_count, is_member = db.session.query(
+        StudyGroup.member_count_of(group_id), StudyGroup.membership_exists(current_user.id, group_id)
+    ).one()
+    members = db.session.query(User.username).join(
+        UserStudyGroup, UserStudyGroup.user_id == User.id
+    ).filter(UserStudyGroup.study_group_id == group_id).order_by(UserStudyGroup.joined_at, UserStudyGroup.id).limit(STUDY_GROUP_MEMBERS_SHOWN).all()
+    return render_template('study_group_detail.html', study_group=study_group, members=members,
+                           member_count=member_count, is_member=is_member)
+
+def _forum_page(course_id, cursor, limit):
+    # Keyset page of post ids first, then one aggregate over just those posts' replies
+    page = select(ForumPost.id, ForumPost.created_at)
+    if course_id:
+        page = page.where(ForumPost.course_id == course_id)
+    page = keyset_page(page, ForumPost.created_at, ForumPost.id, cursor, limit).subquery()
+    statement = select(
+        ForumPost.id,
+        ForumPost.title,
+        ForumPost.created_at,
+        ForumPost.course_id,
+        User.username.label('author'),
+        Course.title.label('course_title'),
+        func.count(ForumReply.id).label('reply_count'),
+        func.coalesce(func.max(ForumReply.created_at), ForumPost.created_at).label('last_activity'),
+    ).join(page, page.c.id == ForumPost.id).outerjoin(
+        User, ForumPost.user_id == User.id
+    ).outerjoin(
+        Course, ForumPost.course_id == Course.id
+    ).outerjoin(
+        ForumReply, ForumReply.post_id == ForumPost.id
+    ).group_by(
+        ForumPost.id, ForumPost.title, ForumPost.created_at, ForumPost.course_id, User.username, Course.title
+    ).order_by(ForumPost.created_at.desc(), ForumPost.id.desc())
+    return split_page(db.session.execute(statement), limit)
 
 @bp.route('/forum')
 @login_required
+@query_budget(2)
 def forum():
-    posts = ForumPost.query.order_by(ForumPost.created_at.desc()).all()
-    return render_template('forum.html', posts=posts)
+    course_id, cursor, limit = _page_args('FORUM_PAGE_SIZE')
+    with read_replica():
+        try:
+            posts, next_cursor = _forum_page(course_id, cursor, limit)
+        except ValueError:
+            abort(400)
+        courses = db.session.query(Course.id, Course.title).order_by(Course.title).all()
+    return render_template('forum.html', posts=posts, next_cursor=next_cursor, courses=courses, course_id=course_id, limit=limit)
+
+@bp.route('/forum/posts')
+@login_required
+@query_budget(1)
+def forum_posts():
+    course_id, cursor, limit = _page_args('FORUM_PAGE_SIZE')
+    with read_replica():
+        try:
+            posts, next_cursor = _forum_page(course_id, cursor, limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({
+        'posts': [{
+            'id': post.id,
+            'title': post.title,
+            'author': post.author,
+            'course_id': post.course_id,
+            'course_title': post.course_title,
+            'created_at': post.created_at.isoformat(),
+            'reply_count': post.reply_count,
+            'last_activity': post.last_activity.isoformat() if post.last_activity else None,
+            'url': url_for('peer_learning.forum_post_detail', post_id=post.id),
+        } for post in posts],
+        'next_cursor': next_cursor,
+    })
 
 @bp.route('/forum/create', methods=['GET', 'POST'])
 @login_required
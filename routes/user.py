@@ -1,26 +1,42 @@
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
-from models import UserCourse, UserQuizResult, Quiz, db
-from services.ai_service import assess_learning_style
+from models import UserCourse, UserQuizResult, Quiz, Course
+from database import db, read_replica
+from services.ai_service import assess_learning_style, dynamic_difficulty_adjustment_batch
+from services.query_budget import query_budget
+import logging
 from sqlalchemy import func
 
 bp = Blueprint('user', __name__)
 
+def _course_progress_rows(user_id):
+    # (course_id, progress, course title) in one query instead of a lazy load per enrollment
+    return db.session.query(UserCourse.course_id, UserCourse.progress, Course.title).outerjoin(
+        Course, UserCourse.course_id == Course.id
+    ).filter(UserCourse.user_id == user_id).all()
+
 @bp.route('/dashboard')
 @login_required
+@query_budget(4)
 def dashboard():
-    user_courses = UserCourse.query.filter_by(user_id=current_user.id).all()
-    course_progress = {}
-    for uc in user_courses:
-        course_title = uc.course.title if uc.course and uc.course.title else 'Unknown Course'
-        if course_title not in course_progress or uc.progress > course_progress[course_title]:
-            course_progress[course_title] = uc.progress
-    course_progress = [{'course': course, 'progress': progress} for course, progress in course_progress.items()]
+    with read_replica():
+        user_courses = _course_progress_rows(current_user.id)
+        try:
+            difficulties = dynamic_difficulty_adjustment_batch(current_user)
+        except Exception as e:
+            logging.error(f"Error in dynamic difficulty adjustment: {str(e)}")
+            difficulties = {}
+        quiz_results = db.session.query(
+            Quiz.title,
+            func.avg(UserQuizResult.score).label('average_score')
+        ).join(UserQuizResult).filter(UserQuizResult.user_id == current_user.id).group_by(Quiz.title).all()
     
-    quiz_results = db.session.query(
-        Quiz.title,
-        func.avg(UserQuizResult.score).label('average_score')
-    ).join(UserQuizResult).filter(UserQuizResult.user_id == current_user.id).group_by(Quiz.title).all()
+    course_progress = {}
+    for course_id, progress, title in user_courses:
+        course_title = title or 'Unknown Course'
+        if course_title not in course_progress or progress > course_progress[course_title]['progress']:
+            course_progress[course_title] = {'progress': progress, 'difficulty': difficulties.get(course_id)}
+    course_progress = [{'course': course, 'progress': entry['progress'], 'difficulty': entry['difficulty']} for course, entry in course_progress.items()]
     
     return render_template('dashboard.html', course_progress=course_progress, quiz_results=quiz_results)
 
@@ -35,7 +51,8 @@ def assess_learning_style():
 
 @bp.route('/progress')
 @login_required
+@query_budget(1)
 def get_progress():
-    user_courses = UserCourse.query.filter_by(user_id=current_user.id).all()
-    progress_data = [{'course': uc.course.title if uc.course and uc.course.title else 'Unknown Course', 'progress': uc.progress} for uc in user_courses]
+    user_courses = _course_progress_rows(current_user.id)
+    progress_data = [{'course': title or 'Unknown Course', 'progress': progress} for _, progress, title in user_courses]
     return jsonify(progress_data)
@@ -1,16 +1,12 @@
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.sparse import csr_matrix, vstack
-from sklearn.decomposition import TruncatedSVD
-from sklearn.pipeline import Pipeline
+from scipy.sparse import csr_matrix
 import logging
+import os
+import threading
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import defer, undefer
 from datetime import datetime, timedelta
-from sklearn.mixture import GaussianMixture
 
 learning_styles = ['visual', 'auditory', 'kinesthetic', 'reading/writing']
 sample_responses = [
@@ -25,13 +21,6 @@ sample_responses = [
 ]
 sample_labels = [0, 1, 2, 3, 0, 1, 2, 3]
 
-vectorizer = TfidfVectorizer()
-X = vectorizer.fit_transform(sample_responses)
-X_train, X_test, y_train, y_test = train_test_split(X, sample_labels, test_size=0.2, random_state=42)
-
-clf = RandomForestClassifier(n_estimators=100, random_state=42)
-clf.fit(X_train, y_train)
-
 user_features = np.array([
     [0.8, 0.7, 0.9, 0.6, 0.5],
     [0.6, 0.5, 0.7, 0.4, 0.3],
@@ -40,63 +29,205 @@ user_features = np.array([
 ])
 difficulty_levels = np.array([0.7, 0.5, 0.8, 0.3])
 
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(user_features)
+def train_default_models():
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    vectorizer = TfidfVectorizer()
+    X = vectorizer.fit_transform(sample_responses)
+    X_train, X_test, y_train, y_test = train_test_split(X, sample_labels, test_size=0.2, random_state=42)
 
-gbr = GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42)
-gbr.fit(X_scaled, difficulty_levels)
+    clf = RandomForestClassifier(n_estimators=100, random_state=42)
+    clf.fit(X_train, y_train)
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(user_features)
+
+    gbr = GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42)
+    gbr.fit(X_scaled, difficulty_levels)
+
+    return {
+        'learning_style_vectorizer': vectorizer,
+        'learning_style_classifier': clf,
+        'difficulty_scaler': scaler,
+        'difficulty_model': gbr,
+    }
+
+DEFAULT_MODELS = ('learning_style_vectorizer', 'learning_style_classifier', 'difficulty_scaler', 'difficulty_model')
+# The default models are versioned together under one CURRENT pointer
+DEFAULT_MODEL_SET = 'default'
+
+_model_registry = None
+_model_lock = threading.Lock()
+
+def get_model_registry():
+    global _model_registry
+    if _model_registry is None:
+        from services.model_registry import ModelRegistry
+        _model_registry = ModelRegistry(current_app.config['MODEL_REGISTRY_PATH'])
+    return _model_registry
+
+def save_default_models():
+    return get_model_registry().save(DEFAULT_MODEL_SET, train_default_models(), {'trainer': 'train_default_models'})
+
+def get_models():
+    """``({name: model}, version)`` for the default model set, training it if none was saved yet."""
+    registry = get_model_registry()
+    models, version = registry.get(DEFAULT_MODEL_SET)
+    if models is None:
+        # The file lock keeps every other worker process from training its own set meanwhile
+        with _model_lock, registry.exclusive(DEFAULT_MODEL_SET):
+            models, version = registry.get(DEFAULT_MODEL_SET)
+            if models is None:
+                logging.warning(f"No saved model set {DEFAULT_MODEL_SET}; training default models")
+                save_default_models()
+                models, version = registry.get(DEFAULT_MODEL_SET)
+    return models, version
+
+def get_model_with_version(name):
+    models, version = get_models()
+    return models[name], version
+
+def get_model(name):
+    return get_model_with_version(name)[0]
+
+_course_index = None
+_course_index_lock = threading.Lock()
+
+def get_course_index():
+    global _course_index
+    vectorizer, version = get_model_with_version('learning_style_vectorizer')
+    if _course_index is None or _course_index.vectorizer is not vectorizer:
+        with _course_index_lock:
+            if _course_index is None or _course_index.vectorizer is not vectorizer:
+                from services.course_index import CourseEmbeddingIndex
+                # Embeddings are only valid for the vectorizer they were projected with
+                path = os.path.join(current_app.config['COURSE_INDEX_PATH'], version)
+                _course_index = CourseEmbeddingIndex(path, vectorizer)
+    return _course_index
+
+_item_similarity_cache = None
+
+def get_item_similarity_cache():
+    global _item_similarity_cache
+    if _item_similarity_cache is None:
+        with _course_index_lock:
+            if _item_similarity_cache is None:
+                from services.item_similarity import ItemSimilarityCache
+                _item_similarity_cache = ItemSimilarityCache(
+                    top_k=current_app.config['ITEM_SIMILARITY_TOP_K'],
+                    refresh_interval=current_app.config['ITEM_SIMILARITY_REFRESH_SECONDS'],
+                    max_age=current_app.config['ITEM_SIMILARITY_MAX_AGE']
+                )
+    return _item_similarity_cache
+
+_adapted_content_cache = None
+
+def get_adapted_content_cache():
+    global _adapted_content_cache
+    if _adapted_content_cache is None:
+        with _course_index_lock:
+            if _adapted_content_cache is None:
+                from services.content_cache import AdaptedContentCache
+                _adapted_content_cache = AdaptedContentCache(current_app.config['ADAPTED_CONTENT_CACHE_SIZE'])
+    return _adapted_content_cache
+
+def catalog_courses():
+    """Every course, without the Markdown and HTML bodies; enough for listing and scoring."""
+    from models import Course
+    return Course.query.options(defer(Course.content), defer(Course.content_html)).all()
+
+def ensure_course_index(course_ids):
+    """The course index with every course in ``course_ids`` embedded.
+
+    Course bodies are only read for courses the index doesn't have yet.
+    """
+    from models import Course
+    course_index = get_course_index()
+    missing = course_index.missing(course_ids)
+    if missing:
+        query = Course.query.options(undefer(Course.content))
+        if len(missing) != len(course_ids):
+            query = query.filter(Course.id.in_(missing))
+        course_index.ensure(query.all())
+    return course_index
+
+def user_ratings(user, features=None):
+    if features is not None:
+        return features.ratings()
+    ratings = {}
+    for uc in user.user_courses:
+        ratings[uc.course_id] = max(ratings.get(uc.course_id, 0), uc.progress or 0)
+    return ratings
+
+def load_user_features(user):
+    from services.user_features import UserFeatures
+    return UserFeatures.load(user)
 
 def assess_learning_style(questionnaire_data):
     responses = [q['answer'] for q in questionnaire_data]
-    X_new = vectorizer.transform(responses)
-    predictions = clf.predict(X_new)
+    X_new = get_model('learning_style_vectorizer').transform(responses)
+    predictions = get_model('learning_style_classifier').predict(X_new)
     learning_style_index = np.bincount(predictions).argmax()
     return learning_styles[learning_style_index]
 
-def calculate_user_performance(user, course_id):
-    user_course = next((uc for uc in user.user_courses if uc.course_id == course_id), None)
-    return user_course.progress if user_course else 0.5
+def calculate_user_performance(user, course_id, features=None):
+    features = features or load_user_features(user)
+    return features.course_progress(course_id, 0.5)
 
-def calculate_time_spent(user, course_id):
-    user_course = next((uc for uc in user.user_courses if uc.course_id == course_id), None)
-    if user_course and user.last_login:
-        time_diff = datetime.utcnow() - user.last_login
-        return min(time_diff.total_seconds() / 3600, 10) / 10
+def calculate_time_spent(user, course_id, features=None):
+    features = features or load_user_features(user)
+    if features.is_enrolled(course_id) and features.last_login:
+        return min(features.hours_since_login(), 10) / 10
     return 0.5
 
-def calculate_engagement_level(user, course_id):
-    return user.engagement_score()
+def calculate_engagement_level(user, course_id, features=None):
+    features = features or load_user_features(user)
+    return features.engagement_score
 
-def calculate_prior_knowledge(user, course_id):
-    related_courses = [uc for uc in user.user_courses if uc.course_id != course_id]
-    if related_courses:
-        return sum(uc.progress for uc in related_courses) / len(related_courses) / 100
+def calculate_prior_knowledge(user, course_id, features=None):
+    features = features or load_user_features(user)
+    related_progress = [progress for related_id, progress in features.progress_rows if related_id != course_id]
+    if related_progress:
+        return sum(related_progress) / len(related_progress) / 100
     return 0.5
 
-def calculate_quiz_performance(user, course_id):
-    from models import UserQuizResult, Quiz
-    quiz_results = UserQuizResult.query.join(Quiz).filter(
-        UserQuizResult.user_id == user.id,
-        Quiz.course_id == course_id
-    ).all()
-    
-    if not quiz_results:
+def calculate_quiz_performance(user, course_id, features=None):
+    features = features or load_user_features(user)
+    average_score = features.quiz_averages.get(course_id)
+    if average_score is None:
         return 0.5
-    
-    average_score = sum(result.score for result in quiz_results) / len(quiz_results)
     return average_score / 100
 
-def adapt_content_difficulty(user_performance, time_spent, engagement_level, prior_knowledge, learning_pace, quiz_performance):
-    user_features = np.array([[user_performance, time_spent, engagement_level, prior_knowledge, learning_pace, quiz_performance]])
-    user_features_scaled = scaler.transform(user_features)
-    predicted_difficulty = gbr.predict(user_features_scaled)[0]
-    
-    if predicted_difficulty > 0.7:
-        return 'hard'
-    elif predicted_difficulty > 0.4:
-        return 'medium'
-    else:
-        return 'easy'
+_compiled_difficulty_model = None
+
+def get_difficulty_predictor():
+    global _compiled_difficulty_model
+    scaler = get_model('difficulty_scaler')
+    gbr, version = get_model_with_version('difficulty_model')
+    if not current_app.config['DIFFICULTY_COMPILED_PREDICTOR']:
+        return lambda X: gbr.predict(scaler.transform(X))
+    compiled = _compiled_difficulty_model
+    if compiled is None or compiled[0] != version:
+        from services.compiled_trees import CompiledGradientBoosting
+        compiled = _compiled_difficulty_model = (version, CompiledGradientBoosting(gbr, scaler))
+    return compiled[1].predict
+
+def difficulty_labels(predicted_difficulties):
+    predicted_difficulties = np.asarray(predicted_difficulties)
+    return np.select([predicted_difficulties > 0.7, predicted_difficulties > 0.4], ['hard', 'medium'], 'easy').tolist()
+
+def predict_difficulties(feature_rows):
+    """Difficulty labels for many feature rows with a single model call."""
+    if len(feature_rows) == 0:
+        return []
+    return difficulty_labels(get_difficulty_predictor()(np.asarray(feature_rows, dtype=np.float64)))
+
+def adapt_content_difficulty(progress, quiz_performance, engagement_level, time_spent, learning_pace):
+    # Same column order as difficulty_feature_row, which the difficulty model is trained on
+    return predict_difficulties([[progress, quiz_performance, engagement_level, time_spent, learning_pace]])[0]
 
 def adapt_to_learning_style(content, learning_style):
     adaptations = {
@@ -107,52 +238,55 @@ def adapt_to_learning_style(content, learning_style):
     }
     return adaptations.get(learning_style, "No specific adaptation")
 
-def generate_adapted_content(content, learning_style, difficulty):
-    if content is None:
-        content = "No content available for this course."
-    adapted_content = f"Adapted content for {learning_style} learners at {difficulty} difficulty:\n\n"
-    
-    if learning_style == 'visual':
-        adapted_content += "Visual Learning Adaptations for Python:\n"
-        adapted_content += "1. Create a flowchart illustrating the Python program execution flow.\n"
-        adapted_content += "2. Develop a mind map connecting Python data types and their relationships.\n"
-        adapted_content += "3. Design an infographic showcasing Python's most common built-in functions.\n"
-        adapted_content += "4. Watch a video demonstration of Python code execution using a visualizer tool.\n"
-    elif learning_style == 'auditory':
-        adapted_content += "Auditory Learning Adaptations:\n"
-        adapted_content += "1. Listen to a podcast discussing Python's core concepts and best practices.\n"
-        adapted_content += "2. Participate in a group discussion about Python's role in data science and web development.\n"
-        adapted_content += "3. Record yourself explaining key Python concepts and listen to it for reinforcement.\n"
-    elif learning_style == 'kinesthetic':
-        adapted_content += "Kinesthetic Learning Adaptations for Python:\n"
-        adapted_content += "1. Complete hands-on coding exercises in an interactive Python environment.\n"
-        adapted_content += "2. Build a small Python project that demonstrates the concepts you've learned.\n"
-        adapted_content += "3. Use physical objects to represent Python data structures and manipulate them.\n"
-    else:  # reading/writing
-        adapted_content += "Reading/Writing Learning Adaptations for Python:\n"
-        adapted_content += "1. Write a detailed summary of Python's core data types and their methods.\n"
-        adapted_content += "2. Create flashcards with Python syntax rules and common coding patterns.\n"
-        adapted_content += "3. Develop a set of practice questions covering Python fundamentals.\n"
-    
-    if difficulty == 'easy':
-        adapted_content += "\nEasy Difficulty Adaptations for Python:\n"
-        adapted_content += "- We'll start with basic Python syntax and simple data types.\n"
-        adapted_content += "- Examples will focus on straightforward operations and built-in functions.\n"
-        adapted_content += "- Practice exercises will reinforce fundamental Python concepts.\n"
-        adapted_content += "\nExample Python code (Easy):\n"
-        adapted_content += """
+STYLE_ADAPTATIONS = {
+    'visual': (
+        "Visual Learning Adaptations for Python:\n"
+        "1. Create a flowchart illustrating the Python program execution flow.\n"
+        "2. Develop a mind map connecting Python data types and their relationships.\n"
+        "3. Design an infographic showcasing Python's most common built-in functions.\n"
+        "4. Watch a video demonstration of Python code execution using a visualizer tool.\n"
+    ),
+    'auditory': (
+        "Auditory Learning Adaptations:\n"
+        "1. Listen to a podcast discussing Python's core concepts and best practices.\n"
+        "2. Participate in a group discussion about Python's role in data science and web development.\n"
+        "3. Record yourself explaining key Python concepts and listen to it for reinforcement.\n"
+    ),
+    'kinesthetic': (
+        "Kinesthetic Learning Adaptations for Python:\n"
+        "1. Complete hands-on coding exercises in an interactive Python environment.\n"
+        "2. Build a small Python project that demonstrates the concepts you've learned.\n"
+        "3. Use physical objects to represent Python data structures and manipulate them.\n"
+    ),
+    'reading/writing': (
+        "Reading/Writing Learning Adaptations for Python:\n"
+        "1. Write a detailed summary of Python's core data types and their methods.\n"
+        "2. Create flashcards with Python syntax rules and common coding patterns.\n"
+        "3. Develop a set of practice questions covering Python fundamentals.\n"
+    ),
+}
+
+DIFFICULTY_ADAPTATIONS = {
+    'easy': (
+        "\nEasy Difficulty Adaptations for Python:\n"
+        "- We'll start with basic Python syntax and simple data types.\n"
+        "- Examples will focus on straightforward operations and built-in functions.\n"
+        "- Practice exercises will reinforce fundamental Python concepts.\n"
+        "\nExample Python code (Easy):\n"
+        """
 # Basic variable assignment and string manipulation
 name = "Alice"
 age = 30
 print(f"Hello, my name is {name} and I am {age} years old.")
 """
-    elif difficulty == 'medium':
-        adapted_content += "\nMedium Difficulty Adaptations for Python:\n"
-        adapted_content += "- We'll explore more complex data structures like lists, dictionaries, and tuples.\n"
-        adapted_content += "- Examples will include working with functions and basic object-oriented programming.\n"
-        adapted_content += "- Practice exercises will require applying Python concepts to solve real-world problems.\n"
-        adapted_content += "\nExample Python code (Medium):\n"
-        adapted_content += """
+    ),
+    'medium': (
+        "\nMedium Difficulty Adaptations for Python:\n"
+        "- We'll explore more complex data structures like lists, dictionaries, and tuples.\n"
+        "- Examples will include working with functions and basic object-oriented programming.\n"
+        "- Practice exercises will require applying Python concepts to solve real-world problems.\n"
+        "\nExample Python code (Medium):\n"
+        """
 # Function to calculate the factorial of a number using recursion
 def factorial(n):
     if n == 0 or n == 1:
@@ -164,13 +298,14 @@ def factorial(n):
 factorials = [factorial(i) for i in range(1, 6)]
 print(f"Factorials of numbers 1 to 5: {factorials}")
 """
-    else:  # hard
-        adapted_content += "\nAdvanced Difficulty Adaptations for Python:\n"
-        adapted_content += "- We'll delve into advanced topics like decorators, generators, and context managers.\n"
-        adapted_content += "- Examples will showcase complex, real-world scenarios using Python libraries and frameworks.\n"
-        adapted_content += "- Practice exercises will challenge you to optimize code and implement design patterns.\n"
-        adapted_content += "\nExample Python code (Hard):\n"
-        adapted_content += """
+    ),
+    'hard': (
+        "\nAdvanced Difficulty Adaptations for Python:\n"
+        "- We'll delve into advanced topics like decorators, generators, and context managers.\n"
+        "- Examples will showcase complex, real-world scenarios using Python libraries and frameworks.\n"
+        "- Practice exercises will challenge you to optimize code and implement design patterns.\n"
+        "\nExample Python code (Hard):\n"
+        """
 # Implementing a decorator to measure function execution time
 import time
 from functools import wraps
@@ -192,18 +327,24 @@ def complex_operation(n):
 result = complex_operation(1000000)
 print(f"Result: {result}")
 """
-    
-    adapted_content += f"\nOriginal Content:\n{content}\n"
-    
-    return adapted_content
+    ),
+}
 
-def recommend_resources(user, course_id):
+def generate_adapted_content(content, learning_style, difficulty):
+    if content is None:
+        content = "No content available for this course."
+    return ''.join([
+        f"Adapted content for {learning_style} learners at {difficulty} difficulty:\n\n",
+        STYLE_ADAPTATIONS.get(learning_style, STYLE_ADAPTATIONS['reading/writing']),
+        DIFFICULTY_ADAPTATIONS.get(difficulty, DIFFICULTY_ADAPTATIONS['hard']),
+        f"\nOriginal Content:\n{content}\n",
+    ])
+
+def recommend_resources(user, course_id, features=None):
+    features = features or load_user_features(user)
     learning_style = user.learning_style or 'visual'
-    user_course = next((uc for uc in user.user_courses if uc.course_id == course_id), None)
-    progress = user_course.progress if user_course else 0
-    difficulty = adapt_content_difficulty(progress, calculate_time_spent(user, course_id), 
-                                          user.engagement_score(), calculate_prior_knowledge(user, course_id), 
-                                          user.learning_pace(), calculate_quiz_performance(user, course_id))
+    progress = features.course_progress(course_id, 0)
+    difficulty = predict_difficulties([difficulty_feature_row(user, course_id, features)])[0]
     
     resources = []
     
@@ -237,12 +378,12 @@ def recommend_resources(user, course_id):
     
     return resources
 
-def generate_adaptive_learning_path(user, course_id):
+def generate_adaptive_learning_path(user, course_id, features=None):
+    features = features or load_user_features(user)
     learning_style = user.learning_style or 'visual'
-    user_course = next((uc for uc in user.user_courses if uc.course_id == course_id), None)
-    progress = user_course.progress if user_course else 0
-    performance = user.average_performance()
-    engagement = user.engagement_score()
+    progress = features.course_progress(course_id, 0)
+    performance = features.average_performance
+    engagement = features.engagement_score
     
     path = ["Introduction to Python programming fundamentals"]
     
@@ -285,141 +426,221 @@ def generate_adaptive_learning_path(user, course_id):
     
     return path
 
-def content_based_recommendations(user, all_courses):
-    user_courses = user.user_courses
-    user_course_vectors = [vectorizer.transform([f"{uc.course.description or ''} {uc.course.content or ''}"]) for uc in user_courses if uc.course]
-    if not user_course_vectors:
+def content_based_recommendations(user, all_courses, features=None):
+    user_course_ids = [course_id for course_id, _ in features.progress_rows] if features else [uc.course_id for uc in user.user_courses]
+    if not user_course_ids:
         return np.zeros((1, len(all_courses)))
-    
-    user_profile = np.asarray(vstack(user_course_vectors).mean(axis=0)).flatten()
-    
-    all_course_vectors = vectorizer.transform([f"{course.description or ''} {course.content or ''}" for course in all_courses])
-    
-    n_components = min(100, all_course_vectors.shape[1] - 1)
-    svd = TruncatedSVD(n_components=n_components, random_state=42)
-    lsa = Pipeline([('svd', svd)])
-    
-    all_course_vectors_lsa = lsa.fit_transform(all_course_vectors)
-    user_profile_lsa = lsa.transform(user_profile.reshape(1, -1))
-    
-    similarities = cosine_similarity(user_profile_lsa, all_course_vectors_lsa)
-    
-    return similarities.flatten().reshape(1, -1)
-
-def collaborative_filtering_recommendations(user, all_courses, all_users):
-    user_course_matrix = np.asarray(np.zeros((len(all_users), len(all_courses))))
-    for i, u in enumerate(all_users):
-        for j, c in enumerate(all_courses):
-            user_course = next((uc for uc in u.user_courses if uc.course_id == c.id), None)
-            user_course_matrix[i, j] = user_course.progress if user_course else 0
 
-    course_similarity = cosine_similarity(user_course_matrix.T)
-    user_ratings = user_course_matrix[all_users.index(user)]
-    
-    recommendations = []
-    for i, course in enumerate(all_courses):
-        if user_ratings[i] == 0:  # User hasn't taken this course
-            similar_courses = course_similarity[i]
-            course_score = np.sum(similar_courses * user_ratings) / np.sum(np.abs(similar_courses))
-            recommendations.append((course, course_score))
-    
-    recommendations.sort(key=lambda x: x[1], reverse=True)
-    return [course for course, _ in recommendations[:5]]
-
-def hybrid_recommendations(user, all_courses, users, n_recommendations=5):
-    content_based_scores = np.asarray(content_based_recommendations(user, all_courses)).flatten()
-    collaborative_recommendations = collaborative_filtering_recommendations(user, all_courses, users)
-
-    hybrid_scores = []
-    for i, course in enumerate(all_courses):
-        content_score = content_based_scores[i]
-        collab_score = 1 if course in collaborative_recommendations else 0
-        hybrid_score = 0.7 * content_score + 0.3 * collab_score
-        hybrid_scores.append((course, hybrid_score))
-
-    hybrid_scores.sort(key=lambda x: x[1], reverse=True)
-    return [course for course, _ in hybrid_scores[:n_recommendations]]
-
-def dynamic_difficulty_adjustment(user, course_id):
-    user_course = next((uc for uc in user.user_courses if uc.course_id == course_id), None)
-    if not user_course:
-        return 'medium'  # Default difficulty
-
-    progress = user_course.progress
-    quiz_performance = calculate_quiz_performance(user, course_id)
-    engagement_level = calculate_engagement_level(user, course_id)
-    time_spent = calculate_time_spent(user, course_id)
-    learning_pace = user.learning_pace()
-
-    X = np.array([[progress, quiz_performance, engagement_level, time_spent, learning_pace]])
-    X_scaled = scaler.transform(X)
-
-    predicted_difficulty = gbr.predict(X_scaled)[0]
-
-    if predicted_difficulty > 0.7:
-        return 'hard'
-    elif predicted_difficulty > 0.4:
-        return 'medium'
-    else:
-        return 'easy'
-
-def personalize_content(user, course_content):
+    course_ids = [course.id for course in all_courses]
+    similarities = ensure_course_index(course_ids).similarities(user_course_ids, course_ids)
+
+    return similarities.reshape(1, -1)
+
+def top_n_indices(scores, n):
+    scores = np.atleast_2d(scores)
+    n = min(n, scores.shape[1])
+    if n <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    # argpartition picks arbitrary members of a tie at the cut-off; take the
+    # earliest tied courses instead, so the result matches a stable full sort
+    cutoff = np.take_along_axis(scores, top, axis=1).min(axis=1, keepdims=True)
+    above = scores > cutoff
+    at_cutoff = scores == cutoff
+    needed = n - above.sum(axis=1, keepdims=True)
+    selected = above | (at_cutoff & (np.cumsum(at_cutoff, axis=1) <= needed))
+    top = np.nonzero(selected)[1].reshape(scores.shape[0], n)
+    order = np.lexsort((top, -np.take_along_axis(scores, top, axis=1)), axis=-1)
+    return np.take_along_axis(top, order, axis=1)
+
+def collaborative_top_indices(collaborative_scores, rated, n=5):
+    # Only courses the user hasn't taken are candidates; rows with fewer
+    # candidates than n get -1 padding.
+    candidates = np.where(rated, -np.inf, collaborative_scores)
+    top = top_n_indices(candidates, n)
+    return np.where(np.isfinite(np.take_along_axis(candidates, top, axis=1)), top, -1)
+
+def blend_hybrid_scores(content_scores, collaborative_scores, rated, n_collaborative=5):
+    top = collaborative_top_indices(collaborative_scores, rated, n_collaborative)
+    indicator = np.zeros(content_scores.shape)
+    rows = np.repeat(np.arange(top.shape[0]), top.shape[1])
+    columns = top.ravel()
+    indicator[rows[columns >= 0], columns[columns >= 0]] = 1
+    return 0.7 * content_scores + 0.3 * indicator
+
+def collaborative_filtering_recommendations(user, all_courses, all_users=None, features=None):
+    ratings = user_ratings(user, features)
+    course_ids = [course.id for course in all_courses]
+    scores = get_item_similarity_cache().scores(ratings, course_ids)
+    rated = np.array([bool(ratings.get(course_id)) for course_id in course_ids], dtype=bool)
+
+    top = collaborative_top_indices(scores.reshape(1, -1), rated.reshape(1, -1))[0]
+    return [all_courses[i] for i in top if i >= 0]
+
+def hybrid_recommendations(user, all_courses, users=None, n_recommendations=5, features=None):
+    course_ids = [course.id for course in all_courses]
+    ratings = user_ratings(user, features)
+    content_scores = np.asarray(content_based_recommendations(user, all_courses, features)).reshape(1, -1)
+    collaborative_scores = get_item_similarity_cache().scores(ratings, course_ids).reshape(1, -1)
+    rated = np.array([[bool(ratings.get(course_id)) for course_id in course_ids]], dtype=bool)
+
+    hybrid_scores = blend_hybrid_scores(content_scores, collaborative_scores, rated)
+    return [all_courses[i] for i in top_n_indices(hybrid_scores, n_recommendations)[0]]
+
+def precomputed_or_live_recommendations(user, all_courses, n_recommendations=5, features=None):
+    from models import UserRecommendation
+    max_age = timedelta(seconds=current_app.config['RECOMMENDATION_MAX_AGE'])
+    rows = UserRecommendation.query.filter(
+        UserRecommendation.user_id == user.id,
+        UserRecommendation.generated_at >= datetime.utcnow() - max_age
+    ).order_by(UserRecommendation.rank).limit(n_recommendations).all()
+
+    courses_by_id = {course.id: course for course in all_courses}
+    recommendations = [courses_by_id[row.course_id] for row in rows if row.course_id in courses_by_id]
+    if recommendations:
+        return recommendations
+    # New users and users whose precomputed rows are stale fall back to live scoring
+    return hybrid_recommendations(user, all_courses, n_recommendations=n_recommendations, features=features)
+
+def hybrid_recommendations_batch(user_ids, n=5, chunk_size=1000):
+    """Hybrid recommendations for many users at once.
+
+    Returns ``{user_id: [course_id, ...]}`` with the same ranking as
+    ``hybrid_recommendations``; users are scored ``chunk_size`` at a time
+    against the shared course index and item neighbor table.
+    """
+    from models import Course, UserCourse
+    from database import db
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id).order_by(Course.id)]
+    if not course_ids:
+        return {user_id: [] for user_id in user_ids}
+    course_positions = {course_id: i for i, course_id in enumerate(course_ids)}
+
+    course_index = ensure_course_index(course_ids)
+    item_similarity = get_item_similarity_cache()
+
+    user_ids = list(user_ids)
+    recommendations = {}
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        user_positions = {user_id: i for i, user_id in enumerate(chunk)}
+        rows = db.session.query(
+            UserCourse.user_id, UserCourse.course_id, func.max(UserCourse.progress)
+        ).filter(UserCourse.user_id.in_(chunk)).group_by(UserCourse.user_id, UserCourse.course_id).all()
+        rows = [(user_positions[user_id], course_positions[course_id], progress or 0)
+                for user_id, course_id, progress in rows if course_id in course_positions]
+        row_idx = [row for row, _, _ in rows]
+        col_idx = [column for _, column, _ in rows]
+        shape = (len(chunk), len(course_ids))
+        membership = csr_matrix((np.ones(len(rows)), (row_idx, col_idx)), shape=shape)
+        ratings = csr_matrix((np.asarray([progress for _, _, progress in rows], dtype=np.float64), (row_idx, col_idx)), shape=shape)
+
+        content_scores = course_index.similarities_matrix(membership, course_ids)
+        collaborative_scores = item_similarity.scores_matrix(ratings, course_ids)
+        rated = ratings.toarray() > 0
+
+        hybrid_scores = blend_hybrid_scores(content_scores, collaborative_scores, rated)
+        for user_id, top in zip(chunk, top_n_indices(hybrid_scores, n)):
+            recommendations[user_id] = [course_ids[i] for i in top]
+    return recommendations
+
+def difficulty_feature_row(user, course_id, features):
+    return [
+        features.course_progress(course_id),
+        calculate_quiz_performance(user, course_id, features),
+        calculate_engagement_level(user, course_id, features),
+        calculate_time_spent(user, course_id, features),
+        features.learning_pace,
+    ]
+
+def dynamic_difficulty_adjustment(user, course_id, features=None):
+    return dynamic_difficulty_adjustment_batch(user, [course_id], features)[course_id]
+
+def dynamic_difficulty_adjustment_batch(user, course_ids=None, features=None):
+    """Difficulty for each of ``course_ids`` (default: every enrolled course) in one predict call."""
+    features = features or load_user_features(user)
+    if course_ids is None:
+        course_ids = list(features.progress)
+    enrolled = [course_id for course_id in course_ids if features.is_enrolled(course_id)]
+    labels = predict_difficulties([difficulty_feature_row(user, course_id, features) for course_id in enrolled])
+    difficulties = {course_id: 'medium' for course_id in course_ids}  # Default difficulty
+    difficulties.update(zip(enrolled, labels))
+    return difficulties
+
+def cohort_difficulty_adjustment(users, course_id):
+    """Difficulty of ``course_id`` for each user in ``users``, keyed by user id."""
+    from services.user_features import UserFeatures
+    features_by_user = UserFeatures.load_many(users)
+    enrolled = [user for user in users if features_by_user[user.id].is_enrolled(course_id)]
+    labels = predict_difficulties([difficulty_feature_row(user, course_id, features_by_user[user.id]) for user in enrolled])
+    difficulties = {user.id: 'medium' for user in users}
+    difficulties.update(zip([user.id for user in enrolled], labels))
+    return difficulties
+
+def personalize_content(user, course_content, features=None):
     logging.info(f"Starting content personalization for user {user.id} and course {course_content['course_id']}")
     try:
         learning_style = user.learning_style or 'visual'
         logging.info(f"User learning style: {learning_style}")
         
+        if features is None:
+            features = load_user_features(user)
+        
         try:
-            user_performance = calculate_user_performance(user, course_content['course_id'])
+            user_performance = calculate_user_performance(user, course_content['course_id'], features)
             logging.info(f"User performance: {user_performance}")
         except Exception as e:
             logging.error(f"Error calculating user performance: {str(e)}")
             user_performance = 0.5  # default value
         
         try:
-            time_spent = calculate_time_spent(user, course_content['course_id'])
+            time_spent = calculate_time_spent(user, course_content['course_id'], features)
             logging.info(f"Time spent: {time_spent}")
         except Exception as e:
             logging.error(f"Error calculating time spent: {str(e)}")
             time_spent = 0.5  # default value
         
         try:
-            engagement_level = calculate_engagement_level(user, course_content['course_id'])
+            engagement_level = calculate_engagement_level(user, course_content['course_id'], features)
             logging.info(f"Engagement level: {engagement_level}")
         except Exception as e:
             logging.error(f"Error calculating engagement level: {str(e)}")
             engagement_level = 0.5  # default value
         
         try:
-            prior_knowledge = calculate_prior_knowledge(user, course_content['course_id'])
+            prior_knowledge = calculate_prior_knowledge(user, course_content['course_id'], features)
             logging.info(f"Prior knowledge: {prior_knowledge}")
         except Exception as e:
             logging.error(f"Error calculating prior knowledge: {str(e)}")
             prior_knowledge = 0.5  # default value
         
         try:
-            learning_pace = user.learning_pace()
+            learning_pace = features.learning_pace
             logging.info(f"Learning pace: {learning_pace}")
         except Exception as e:
             logging.error(f"Error calculating learning pace: {str(e)}")
             learning_pace = 0.5  # default value
         
         try:
-            quiz_performance = calculate_quiz_performance(user, course_content['course_id'])
+            quiz_performance = calculate_quiz_performance(user, course_content['course_id'], features)
             logging.info(f"Quiz performance: {quiz_performance}")
         except Exception as e:
             logging.error(f"Error calculating quiz performance: {str(e)}")
             quiz_performance = 0.5  # default value
         
         try:
-            difficulty = dynamic_difficulty_adjustment(user, course_content['course_id'])
+            difficulty = dynamic_difficulty_adjustment(user, course_content['course_id'], features)
             logging.info(f"Dynamically adjusted difficulty: {difficulty}")
         except Exception as e:
             logging.error(f"Error in dynamic difficulty adjustment: {str(e)}")
             difficulty = 'medium'  # default value
         
         try:
-            adapted_content = generate_adapted_content(course_content.get('content'), learning_style, difficulty)
+            from services.content_service import render_course_html
+            adapted_content = get_adapted_content_cache().get_or_render(
+                course_content['course_id'], course_content.get('content'), learning_style, difficulty,
+                lambda: render_course_html(generate_adapted_content(course_content.get('content'), learning_style, difficulty))
+            )
             logging.info(f"Generated adapted content (first 100 characters): {adapted_content[:100]}...")
         except Exception as e:
             logging.error(f"Error generating adapted content: {str(e)}")
@@ -433,31 +654,29 @@ def personalize_content(user, course_content):
             learning_style_adaptations = "Unable to adapt content to learning style"
         
         try:
-            recommended_resources = recommend_resources(user, course_content['course_id'])
+            recommended_resources = recommend_resources(user, course_content['course_id'], features)
             logging.info(f"Generated recommended resources: {recommended_resources}")
         except Exception as e:
             logging.error(f"Error generating recommended resources: {str(e)}")
             recommended_resources = []
         
         try:
-            adaptive_path = generate_adaptive_learning_path(user, course_content['course_id'])
+            adaptive_path = generate_adaptive_learning_path(user, course_content['course_id'], features)
             logging.info(f"Generated adaptive learning path: {adaptive_path}")
         except Exception as e:
             logging.error(f"Error generating adaptive learning path: {str(e)}")
             adaptive_path = []
         
         try:
-            from models import User, Course
-            all_users = User.query.all()
-            all_courses = Course.query.all()
-            collab_recommendations = collaborative_filtering_recommendations(user, all_courses, all_users)
+            all_courses = catalog_courses()
+            collab_recommendations = collaborative_filtering_recommendations(user, all_courses, features=features)
             logging.info(f"Generated collaborative filtering recommendations: {collab_recommendations}")
         except Exception as e:
             logging.error(f"Error generating collaborative filtering recommendations: {str(e)}")
             collab_recommendations = []
         
         personalized_content = {
-            'original_content': course_content.get('content') or 'No content available',
+            'original_content': course_content.get('content_html') or course_content.get('content') or 'No content available',
             'adapted_content': adapted_content,
             'difficulty': difficulty,
             'learning_style_adaptations': learning_style_adaptations,
@@ -471,7 +690,7 @@ def personalize_content(user, course_content):
     except Exception as e:
         logging.error(f"Unexpected error in personalize_content: {str(e)}")
         return {
-            'original_content': course_content.get('content') or 'No content available',
+            'original_content': course_content.get('content_html') or course_content.get('content') or 'No content available',
             'adapted_content': 'Error occurred while personalizing content',
             'difficulty': 'unknown',
             'learning_style_adaptations': 'Unable to adapt content',
@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from flask import current_app, request, send_file, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+SERVICE_WORKER = 'js/service-worker.js'
+
+# Registered by the page with a literal URL; a service worker's URL must not change
+UNFINGERPRINTED_ASSETS = (SERVICE_WORKER,)
+
+# Dynamic responses compressed by ``compress_response``
+COMPRESSIBLE_MIMETYPES = ('text/html', 'application/json', 'application/javascript', 'text/css')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Pages the service worker precaches, with the templates they render. Only pages that
+# look the same for every visitor: precached pages are served before the network
+PRECACHE_PAGES = {
+    '/offline': ('offline.html', 'base.html'),
+}
+
+# Content-Encoding -> suffix of the precompressed file written by build_assets.py
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+class AssetManifest:
+    """Maps static paths to the fingerprinted copies written by ``build_assets.py``."""
+
+    def __init__(self, build_dir, assets=None):
+        self.build_dir = build_dir
+        self.assets = assets or {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            logging.info(f"No asset manifest at {path}; serving static files unfingerprinted")
+            return cls(os.path.dirname(path))
+        with open(path, encoding='utf-8') as f:
+            assets = json.load(f)
+        logging.info(f"Loaded asset manifest with {len(assets)} fingerprinted files")
+        return cls(os.path.dirname(path), assets)
+
+    def url_filename(self, filename):
+        if filename in UNFINGERPRINTED_ASSETS:
+            return filename
+        return self.assets.get(filename, filename)
+
+
+def _asset_manifest():
+    return current_app.extensions['asset_manifest']
+
+
+def _accepted_encodings(build_path):
+    """Content-Encodings the client accepts that have a precompressed file, best first."""
+    available = [encoding for encoding, suffix in PRECOMPRESSED_SUFFIXES.items() if os.path.exists(build_path + suffix)]
+    accepted = [encoding for encoding in available if request.accept_encodings[encoding]]
+    return sorted(accepted, key=lambda encoding: -request.accept_encodings[encoding])
+
+
+def send_asset(filename):
+    """Serve a static file, preferring a precompressed build the client accepts.
+
+    Fingerprinted names (from this or an earlier build) are cached for a
+    year as immutable. Source names are revalidated on each use and only
+    use the build while the source is no newer than it, so edits show up
+    before the next build.
+    """
+    manifest = _asset_manifest()
+    static_folder = current_app.static_folder
+    fingerprinted = filename not in manifest.assets
+    build_path = safe_join(manifest.build_dir, manifest.assets.get(filename, filename))
+    if build_path is not None and not fingerprinted:
+        source_path = os.path.join(static_folder, filename)
+        if os.path.exists(build_path) and (not os.path.exists(source_path) or os.path.getmtime(source_path) > os.path.getmtime(build_path)):
+            build_path = None
+    if build_path is None or not os.path.isfile(build_path):
+        response = send_from_directory(static_folder, filename)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encodings = _accepted_encodings(build_path)
+    if encodings:
+        response = send_file(build_path + PRECOMPRESSED_SUFFIXES[encodings[0]], mimetype=mimetype)
+        response.headers['Content-Encoding'] = encodings[0]
+    else:
+        response = send_file(build_path, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if fingerprinted else 'no-cache'
+    return response
+
+
+def compress_response(response):
+    """Add a validator to cacheable GET responses and gzip them for clients that accept it."""
+    config = current_app.config
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+    if not response.get_etag()[0]:
+        response.add_etag()
+    if 'Cache-Control' not in response.headers:
+        # Pages are per-user: the browser may keep a copy but must revalidate it
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.make_conditional(request)
+    if response.status_code != 200 or not config['COMPRESS_RESPONSES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < config['COMPRESS_MIN_SIZE'] or not request.accept_encodings['gzip']:
+        return response
+    response.set_data(gzip.compress(body, config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The gzipped body is a different representation of the same content
+    etag, _ = response.get_etag()
+    response.set_etag(etag, weak=True)
+    return response
+
+
+_file_revisions = {}
+
+
+def file_revision(path):
+    """Content hash of ``path``, recomputed only when its size or mtime changes."""
+    stat = os.stat(path)
+    cached = _file_revisions.get(path)
+    if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+        with open(path, 'rb') as f:
+            cached = ((stat.st_mtime_ns, stat.st_size), hashlib.sha256(f.read()).hexdigest()[:12])
+        _file_revisions[path] = cached
+    return cached[1]
+
+
+def precache_manifest():
+    """``[{'url': ..., 'revision': ...}]`` for every static file and precached page."""
+    static_folder = current_app.static_folder
+    build_dir = os.path.abspath(_asset_manifest().build_dir)
+    entries = []
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != build_dir)
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if filename != SERVICE_WORKER:
+                entries.append({'url': url_for('static', filename=filename), 'revision': file_revision(path)})
+
+    # A page changes with its templates and with the asset URLs it links to
+    template_folder = os.path.join(current_app.root_path, current_app.template_folder)
+    assets_revision = hashlib.sha256(json.dumps(entries, sort_keys=True).encode('utf-8')).hexdigest()
+    for url, templates in PRECACHE_PAGES.items():
+        digest = hashlib.sha256(assets_revision.encode('utf-8'))
+        for template in templates:
+            digest.update(file_revision(os.path.join(template_folder, template)).encode('utf-8'))
+        entries.append({'url': url, 'revision': digest.hexdigest()[:12]})
+    return entries
+
+
+def service_worker_response():
+    """The service worker script with the current precache manifest prepended."""
+    with open(os.path.join(current_app.static_folder, SERVICE_WORKER), encoding='utf-8') as f:
+        source = f.read()
+    body = f"self.__PRECACHE_MANIFEST = {json.dumps(precache_manifest())};\n{source}"
+    response = current_app.response_class(body, mimetype='application/javascript')
+    # Served from /static/js/ but controls the whole site
+    response.headers['Service-Worker-Allowed'] = '/'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def init_assets(app):
+    manifest = AssetManifest.load(app.config['ASSET_MANIFEST_PATH'])
+    app.extensions['asset_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.url_filename(values['filename'])
+
+    app.view_functions['static'] = send_asset
+    app.after_request(compress_response)
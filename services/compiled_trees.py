@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class CompiledGradientBoosting:
+    """A fitted GradientBoostingRegressor (and optional StandardScaler) flattened
+    into padded NumPy arrays.
+
+    ``predict`` walks every tree in lockstep, one level per step, so scoring
+    a single row costs a handful of array operations instead of a
+    scikit-learn call per tree. Results match ``gbr.predict(scaler.transform(X))``.
+    """
+
+    def __init__(self, gbr, scaler=None):
+        trees = [estimator[0].tree_ for estimator in gbr.estimators_]
+        n_trees = len(trees)
+        max_nodes = max(tree.node_count for tree in trees)
+        self.n_features = gbr.n_features_in_
+        self.depth = max(tree.max_depth for tree in trees)
+        self.feature = np.full((n_trees, max_nodes), -1, dtype=np.int64)
+        self.threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+        self.left = np.zeros((n_trees, max_nodes), dtype=np.int64)
+        self.right = np.zeros((n_trees, max_nodes), dtype=np.int64)
+        self.value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+        for i, tree in enumerate(trees):
+            n = tree.node_count
+            self.feature[i, :n] = tree.feature
+            self.threshold[i, :n] = tree.threshold
+            self.left[i, :n] = tree.children_left
+            self.right[i, :n] = tree.children_right
+            self.value[i, :n] = tree.value[:, 0, 0] * gbr.learning_rate
+        self._trees = np.arange(n_trees)
+
+        if gbr.init_ == 'zero':
+            self.baseline = 0.0
+        else:
+            self.baseline = float(np.ravel(gbr.init_.predict(np.zeros((1, self.n_features))))[0])
+
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler is not None and scaler.with_mean else None
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler is not None and scaler.with_std else None
+
+    def predict(self, X):
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the difficulty model is expecting {self.n_features} features as input.")
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        # scikit-learn trees compare float32 inputs against their thresholds
+        X = X.astype(np.float32)
+
+        nodes = np.zeros((X.shape[0], len(self._trees)), dtype=np.int64)
+        for _ in range(self.depth):
+            feature = self.feature[self._trees, nodes]
+            is_leaf = feature < 0
+            x = np.take_along_axis(X, np.where(is_leaf, 0, feature), axis=1)
+            go_left = x <= self.threshold[self._trees, nodes]
+            children = np.where(go_left, self.left[self._trees, nodes], self.right[self._trees, nodes])
+            nodes = np.where(is_leaf, nodes, children)
+        return self.baseline + self.value[self._trees, nodes].sum(axis=1)
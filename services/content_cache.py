@@ -0,0 +1,85 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+def content_hash(content):
+    return hashlib.sha1((content or '').encode('utf-8')).hexdigest()
+
+
+class AdaptedContentCache:
+    """Bounded LRU cache of rendered adapted-content variants.
+
+    Keys are ``(course_id, content_hash, learning_style, difficulty)``. The
+    content hash keeps other worker processes from serving a stale variant
+    after an edit; ``invalidate_course`` frees the old variants right away.
+    """
+
+    def __init__(self, max_size=4096, log_every=1000):
+        self.max_size = max_size
+        self.log_every = log_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_course = {}
+
+    def get_or_render(self, course_id, content, learning_style, difficulty, render):
+        key = (course_id, content_hash(content), learning_style, difficulty)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._maybe_log()
+                return value
+            self.misses += 1
+            self._maybe_log()
+
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._keys_by_course.setdefault(course_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._discard_key(evicted)
+                self.evictions += 1
+        return value
+
+    def _discard_key(self, key):
+        keys = self._keys_by_course.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_course[key[0]]
+
+    def invalidate_course(self, course_id):
+        with self._lock:
+            for key in self._keys_by_course.pop(course_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_course.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _maybe_log(self):
+        lookups = self.hits + self.misses
+        if self.log_every and lookups % self.log_every == 0:
+            logging.info(f"Adapted content cache: {len(self._entries)}/{self.max_size} entries, "
+                         f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions")
@@ -1,4 +1,26 @@
 from services.ai_service import adapt_content_difficulty
+import bleach
+import markdown2
+
+MARKDOWN_EXTRAS = ['fenced-code-blocks', 'tables']
+ALLOWED_TAGS = set(bleach.sanitizer.ALLOWED_TAGS) | {
+    'p', 'br', 'hr', 'pre', 'span', 'div', 'img',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'img': ['src', 'alt', 'title'],
+    'code': ['class'],
+    'span': ['class'],
+    'div': ['class'],
+    'th': ['align'],
+    'td': ['align'],
+}
+
+def render_course_html(markdown_text):
+    html = markdown2.markdown(markdown_text or '', extras=MARKDOWN_EXTRAS)
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
 
 def get_personalized_content(user, course):
     # Dummy content for demonstration
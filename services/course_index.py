@@ -0,0 +1,220 @@
+import os
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+import numpy as np
+import joblib
+from scipy.sparse import csr_matrix, diags
+from sklearn.decomposition import TruncatedSVD
+
+
+def course_document(course):
+    return f"{course.description or ''} {course.content or ''}"
+
+
+class CourseEmbeddingIndex:
+    """LSA embeddings for every course, persisted under ``path``.
+
+    The SVD projection is fitted once over the whole catalog; afterwards
+    courses are projected with the existing fit as they are created or
+    edited, so a recommendation lookup is a single matrix-vector product.
+    Readers take the arrays outside the lock, so updates build new arrays
+    and swap them in. Every worker process keeps its own copy; updates hold
+    an exclusive lock on ``index.lock`` and start from the latest saved
+    index, so processes editing different courses don't drop each other's
+    rows.
+    """
+
+    def __init__(self, path, vectorizer, n_components=100):
+        self.path = path
+        self.vectorizer = vectorizer
+        self.n_components = n_components
+        self._lock = threading.RLock()
+        self._svd = None
+        self._embeddings = None
+        self._norms = None
+        self._course_ids = np.zeros(0, dtype=np.int64)
+        self._positions = {}
+        self._loaded_mtime = None
+        self._writing = False
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _set_rows(self, course_ids, embeddings):
+        self._course_ids = np.asarray(course_ids, dtype=np.int64)
+        self._embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._norms = np.linalg.norm(self._embeddings, axis=1)
+        self._positions = {int(course_id): i for i, course_id in enumerate(self._course_ids)}
+
+    def _project(self, courses):
+        vectors = self.vectorizer.transform([course_document(course) for course in courses])
+        return self._svd.transform(vectors).astype(np.float32)
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        for name, value in (('course_ids.npy', self._course_ids), ('embeddings.npy', self._embeddings)):
+            tmp = self._file(name + '.tmp')
+            with open(tmp, 'wb') as f:
+                np.save(f, value)
+            os.replace(tmp, self._file(name))
+        # The projection is written last; its mtime marks the index version.
+        tmp = self._file('svd.joblib.tmp')
+        joblib.dump(self._svd, tmp)
+        os.replace(tmp, self._file('svd.joblib'))
+        self._loaded_mtime = os.stat(self._file('svd.joblib')).st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self, operation):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file('index.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the index for an update, in this process and on disk, with the latest saved copy loaded."""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._writing = True
+            try:
+                self._refresh_from_disk()
+                yield
+            finally:
+                self._writing = False
+
+    def _load_files(self):
+        mtime = os.stat(self._file('svd.joblib')).st_mtime_ns
+        return mtime, joblib.load(self._file('svd.joblib')), np.load(self._file('course_ids.npy')), np.load(self._file('embeddings.npy'))
+
+    def _refresh_from_disk(self):
+        try:
+            mtime = os.stat(self._file('svd.joblib')).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            if self._writing:
+                mtime, svd, course_ids, embeddings = self._load_files()
+            else:
+                # Writers replace the files one at a time; don't read between them
+                with self._file_lock(fcntl.LOCK_SH):
+                    mtime, svd, course_ids, embeddings = self._load_files()
+        except Exception as e:
+            logging.error(f"Error loading course index from {self.path}: {str(e)}")
+            return
+        self._svd = svd
+        self._set_rows(course_ids, embeddings)
+        self._loaded_mtime = mtime
+        logging.info(f"Loaded course index with {len(course_ids)} courses from {self.path}")
+
+    def _rebuild(self, courses):
+        vectors = self.vectorizer.transform([course_document(course) for course in courses])
+        n_components = max(1, min(self.n_components, vectors.shape[1] - 1))
+        self._svd = TruncatedSVD(n_components=n_components, random_state=42)
+        embeddings = self._svd.fit_transform(vectors).astype(np.float32)
+        self._set_rows([course.id for course in courses], embeddings)
+        self._save()
+        logging.info(f"Rebuilt course index with {len(courses)} courses")
+
+    def rebuild(self, courses):
+        with self._exclusive():
+            self._rebuild(courses)
+
+    def ensure(self, courses):
+        """Load the index, fitting it on first use and adding any missing courses."""
+        with self._lock:
+            self._refresh_from_disk()
+            if self._svd is not None and all(course.id in self._positions for course in courses):
+                return
+            with self._exclusive():
+                if self._svd is None:
+                    self._rebuild(courses)
+                    return
+                missing = [course for course in courses if course.id not in self._positions]
+                if missing:
+                    self._upsert(missing)
+
+    def _upsert(self, courses):
+        embeddings = self._embeddings.copy()
+        course_ids = self._course_ids
+        new_ids, new_rows = [], []
+        for course, row in zip(courses, self._project(courses)):
+            position = self._positions.get(course.id)
+            if position is None:
+                new_ids.append(course.id)
+                new_rows.append(row)
+            else:
+                embeddings[position] = row
+        if new_rows:
+            course_ids = np.concatenate([course_ids, np.asarray(new_ids, dtype=np.int64)])
+            embeddings = np.vstack([embeddings, np.asarray(new_rows, dtype=np.float32)])
+        self._set_rows(course_ids, embeddings)
+        self._save()
+
+    def upsert(self, courses):
+        with self._exclusive():
+            if self._svd is not None:
+                self._upsert(courses)
+
+    def remove(self, course_id):
+        with self._exclusive():
+            position = self._positions.get(course_id)
+            if position is None:
+                return
+            self._set_rows(np.delete(self._course_ids, position), np.delete(self._embeddings, position, axis=0))
+            self._save()
+
+    def missing(self, course_ids):
+        with self._lock:
+            self._refresh_from_disk()
+            if self._svd is None:
+                return list(course_ids)
+            return [course_id for course_id in course_ids if course_id not in self._positions]
+
+    def _aligned(self, course_ids):
+        with self._lock:
+            embeddings, norms, positions = self._embeddings, self._norms, self._positions
+        targets = np.array([positions.get(course_id, -1) for course_id in course_ids], dtype=np.int64)
+        found = targets >= 0
+        aligned = np.zeros((len(course_ids), embeddings.shape[1] if embeddings is not None else 0), dtype=np.float32)
+        aligned_norms = np.zeros(len(course_ids), dtype=np.float32)
+        if embeddings is not None:
+            aligned[found] = embeddings[targets[found]]
+            aligned_norms[found] = norms[targets[found]]
+        return aligned, aligned_norms, found
+
+    def similarities_matrix(self, membership, course_ids):
+        """Batched ``similarities``: ``membership`` is a sparse users x ``course_ids``
+        matrix marking each user's courses; returns a dense users x courses array."""
+        embeddings, norms, found = self._aligned(course_ids)
+        membership = csr_matrix(membership, dtype=np.float32) @ diags(found.astype(np.float32))
+        counts = np.asarray(membership.sum(axis=1)).ravel()
+        profiles = np.asarray(diags(np.divide(1.0, counts, out=np.zeros_like(counts), where=counts > 0)) @ membership @ embeddings)
+        profile_norms = np.linalg.norm(profiles, axis=1)
+        denominators = np.outer(profile_norms, norms)
+        return np.divide(profiles @ embeddings.T, denominators, out=np.zeros(denominators.shape, dtype=np.float32), where=denominators > 0)
+
+    def similarities(self, profile_course_ids, course_ids):
+        """Cosine similarity between the mean embedding of ``profile_course_ids``
+        and each course in ``course_ids`` (0 for courses not in the index)."""
+        with self._lock:
+            embeddings, norms, positions = self._embeddings, self._norms, self._positions
+        scores = np.zeros(len(course_ids))
+        rows = [positions[course_id] for course_id in profile_course_ids if course_id in positions]
+        if embeddings is None or not rows:
+            return scores
+        profile = embeddings[rows].mean(axis=0)
+        profile_norm = np.linalg.norm(profile)
+        if profile_norm == 0:
+            return scores
+        denominators = norms * profile_norm
+        all_scores = np.divide(embeddings @ profile, denominators, out=np.zeros(len(norms), dtype=np.float32), where=denominators > 0)
+        targets = np.array([positions.get(course_id, -1) for course_id in course_ids], dtype=np.int64)
+        found = targets >= 0
+        scores[found] = all_scores[targets[found]]
+        return scores
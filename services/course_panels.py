@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from database import db, read_replica
+from services.ai_service import (
+    adapt_to_learning_style, catalog_courses, collaborative_filtering_recommendations, dynamic_difficulty_adjustment,
+    generate_adapted_content, generate_adaptive_learning_path, get_adapted_content_cache, load_user_features,
+    precomputed_or_live_recommendations, recommend_resources,
+)
+from services.content_service import render_course_html
+
+
+def personalization_panel(user, course_id, features):
+    from models import Course
+    learning_style = user.learning_style or 'visual'
+    try:
+        difficulty = dynamic_difficulty_adjustment(user, course_id, features)
+    except Exception as e:
+        logging.error(f"Error in dynamic difficulty adjustment: {str(e)}")
+        difficulty = 'medium'  # default value
+    content = db.session.query(Course.content).filter_by(id=course_id).scalar()
+    try:
+        adapted_content = get_adapted_content_cache().get_or_render(
+            course_id, content, learning_style, difficulty,
+            lambda: render_course_html(generate_adapted_content(content, learning_style, difficulty))
+        )
+    except Exception as e:
+        logging.error(f"Error generating adapted content: {str(e)}")
+        adapted_content = "Error occurred while adapting content"
+    try:
+        learning_style_adaptations = adapt_to_learning_style(content or '', learning_style)
+    except Exception as e:
+        logging.error(f"Error generating learning style adaptations: {str(e)}")
+        learning_style_adaptations = "Unable to adapt content to learning style"
+    return {
+        'difficulty': difficulty,
+        'adapted_content': adapted_content,
+        'learning_style_adaptations': learning_style_adaptations,
+    }
+
+
+def resources_panel(user, course_id, features):
+    try:
+        return {'recommended_resources': recommend_resources(user, course_id, features)}
+    except Exception as e:
+        logging.error(f"Error generating recommended resources: {str(e)}")
+        return {'recommended_resources': []}
+
+
+def adaptive_path_panel(user, course_id, features):
+    try:
+        return {'adaptive_path': generate_adaptive_learning_path(user, course_id, features)}
+    except Exception as e:
+        logging.error(f"Error generating adaptive learning path: {str(e)}")
+        return {'adaptive_path': []}
+
+
+def recommendations_panel(user, course_id, features):
+    with read_replica():
+        all_courses = catalog_courses()
+        recommended_courses = precomputed_or_live_recommendations(user, all_courses, features=features)
+    try:
+        collaborative = collaborative_filtering_recommendations(user, all_courses, features=features)
+    except Exception as e:
+        logging.error(f"Error generating collaborative filtering recommendations: {str(e)}")
+        collaborative = []
+    return {
+        'recommended_courses': [{'id': course.id, 'title': course.title} for course in recommended_courses],
+        'collaborative_recommendations': [course.title for course in collaborative],
+    }
+
+
+# Panel name -> function(user, course_id, features) returning the panel's JSON body
+PANELS = {
+    'personalization': personalization_panel,
+    'resources': resources_panel,
+    'adaptive_path': adaptive_path_panel,
+    'recommendations': recommendations_panel,
+}
+
+
+def compute_panel(user, course_id, panel, features=None):
+    features = features or load_user_features(user)
+    return PANELS[panel](user, course_id, features)
+
+
+class PanelPool:
+    """Computes course page panels on a local thread pool ahead of the browser asking for them.
+
+    ``speculate`` is called while the course page is being rendered, with the
+    user's features loaded once for all panels; by the time the page's
+    scripts request each panel, its result is usually ready.
+    A result is handed out once (``take``) and unclaimed results expire
+    after ``result_ttl`` seconds, so a panel is never older than that. At
+    most ``max_pending`` computations are tracked; beyond that, panels are
+    computed when requested.
+    """
+
+    def __init__(self, app, max_workers=4, result_ttl=60, max_pending=1000):
+        self.app = app
+        self.result_ttl = result_ttl
+        self.max_pending = max_pending
+        self.submitted = 0
+        self.taken = 0
+        self.expired = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='course-panels')
+        self._lock = threading.Lock()
+        # (user_id, course_id, panel) -> (submitted_at, future), oldest first
+        self._futures = {}
+
+    def _compute(self, user_id, course_id, panel, features):
+        from models import User
+        with self.app.app_context():
+            user = db.session.get(User, user_id)
+            return compute_panel(user, course_id, panel, features)
+
+    def _expire(self, now):
+        for key, (submitted_at, future) in list(self._futures.items()):
+            if now - submitted_at <= self.result_ttl:
+                break
+            future.cancel()
+            del self._futures[key]
+            self.expired += 1
+
+    def speculate(self, user_id, course_id, features, panels=tuple(PANELS)):
+        """Start computing ``panels``; all of them read the same ``features`` snapshot."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            for panel in panels:
+                key = (user_id, course_id, panel)
+                if key in self._futures or len(self._futures) >= self.max_pending:
+                    continue
+                self._futures[key] = (now, self._executor.submit(self._compute, user_id, course_id, panel, features))
+                self.submitted += 1
+
+    def take(self, user_id, course_id, panel):
+        """The speculative computation of a panel, or None if there is none (or it expired)."""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._futures.pop((user_id, course_id, panel), None)
+            if entry is None:
+                return None
+            self.taken += 1
+            return entry[1]
+
+
+_panel_pool = None
+_panel_pool_lock = threading.Lock()
+
+
+def get_panel_pool():
+    global _panel_pool
+    if _panel_pool is None:
+        with _panel_pool_lock:
+            if _panel_pool is None:
+                _panel_pool = PanelPool(
+                    current_app._get_current_object(),
+                    current_app.config['PANEL_WORKERS'],
+                    current_app.config['PANEL_RESULT_TTL'],
+                    current_app.config['PANEL_MAX_PENDING'],
+                )
+    return _panel_pool
+
+
+def panel_result(user, course_id, panel):
+    """A panel's JSON body, from its speculative computation if there is one, else computed now."""
+    future = get_panel_pool().take(user.id, course_id, panel) if current_app.config['PANEL_SPECULATIVE'] else None
+    if future is not None:
+        try:
+            return future.result(timeout=current_app.config['PANEL_WAIT_SECONDS'])
+        except Exception as e:
+            logging.error(f"Error computing {panel} panel for user {user.id} and course {course_id}: {str(e)}")
+    return compute_panel(user, course_id, panel)
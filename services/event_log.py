@@ -0,0 +1,223 @@
+import atexit
+import logging
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+
+# Feedback form choices mapped onto 1-3 rating scales for the course rollups
+DIFFICULTY_RATINGS = {'easy': 1, 'medium': 2, 'hard': 3}
+ENGAGEMENT_RATINGS = {'low': 1, 'medium': 2, 'high': 3}
+
+ROLLUP_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def rollup_increments(events):
+    """Sum a batch of events into ``{course_id: {column: increment}}`` for CourseEventRollup."""
+    increments = defaultdict(lambda: defaultdict(float))
+    for event in events:
+        course_id = event.get('course_id')
+        if course_id is None:
+            continue
+        totals = increments[course_id]
+        event_type = event['event_type']
+        if event_type == 'view':
+            totals['view_count'] += 1
+        elif event_type == 'progress':
+            totals['progress_count'] += 1
+        elif event_type == 'feedback':
+            payload = event.get('payload') or {}
+            totals['feedback_count'] += 1
+            difficulty = DIFFICULTY_RATINGS.get(payload.get('difficulty'))
+            if difficulty is not None:
+                totals['difficulty_total'] += difficulty
+                totals['difficulty_ratings'] += 1
+            engagement = ENGAGEMENT_RATINGS.get(payload.get('engagement'))
+            if engagement is not None:
+                totals['engagement_total'] += engagement
+                totals['engagement_ratings'] += 1
+        elif event_type == 'quiz_submission' and event.get('value') is not None:
+            # Free-text quizzes are submitted without a score and don't count towards the average
+            totals['quiz_submission_count'] += 1
+            totals['quiz_score_total'] += event['value']
+    return increments
+
+
+def apply_rollups(increments):
+    from models import CourseEventRollup
+    if not increments:
+        return
+    table = CourseEventRollup.__table__
+    now = datetime.utcnow()
+    upsert = ROLLUP_UPSERT_INSERTS.get(db.session.get_bind(CourseEventRollup.__mapper__).dialect.name)
+    if upsert is not None:
+        # One executemany for every course in the batch
+        columns = sorted({column for totals in increments.values() for column in totals})
+        statement = upsert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['course_id'],
+            set_=dict({column: table.c[column] + statement.excluded[column] for column in columns}, updated_at=now),
+        )
+        db.session.execute(statement, [
+            dict({column: totals.get(column, 0) for column in columns}, course_id=course_id, updated_at=now)
+            for course_id, totals in increments.items()
+        ])
+        return
+    for course_id, totals in increments.items():
+        updated = db.session.execute(
+            update(table).where(table.c.course_id == course_id).values(
+                updated_at=now, **{column: table.c[column] + increment for column, increment in totals.items()}
+            )
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(table).values(course_id=course_id, updated_at=now, **totals))
+
+
+def write_events(events):
+    """Insert a batch of events and fold them into the course rollups, in the caller's transaction."""
+    from models import LearningEvent
+    if not events:
+        return
+    db.session.execute(insert(LearningEvent.__table__), [
+        {
+            'user_id': event['user_id'],
+            'course_id': event.get('course_id'),
+            'event_type': event['event_type'],
+            'value': event.get('value'),
+            'payload': event.get('payload'),
+            'created_at': event['created_at'],
+        }
+        for event in events
+    ])
+    apply_rollups(rollup_increments(events))
+
+
+class EventQueue:
+    """In-process queue that writes learning events off the request thread.
+
+    A background thread inserts events in batches of up to ``batch_size``,
+    waiting at most ``flush_interval`` seconds for a batch to fill. When
+    ``max_queued`` events are waiting, new events are dropped and counted
+    rather than blocking requests.
+    """
+
+    def __init__(self, app, batch_size=500, flush_interval=2.0, max_queued=100000):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped = True
+        if self._thread is not None:
+            self._thread.join(self.flush_interval * 2)
+        self.flush()
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logging.warning(f"Learning event queue full; {self.dropped} events dropped so far")
+
+    def _next_batch(self, timeout):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._next_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def flush(self):
+        while True:
+            batch = self._next_batch(0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _write(self, batch):
+        from models import Course
+        with self.app.app_context():
+            try:
+                write_events(batch)
+                db.session.commit()
+                self.written += len(batch)
+                return
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error writing {len(batch)} learning events: {str(e)}")
+            # Most likely a course deleted while its events were queued; retry without those
+            course_ids = {event['course_id'] for event in batch if event.get('course_id') is not None}
+            existing = {course_id for (course_id,) in db.session.query(Course.id).filter(Course.id.in_(course_ids))}
+            retry = [event for event in batch if event.get('course_id') is None or event['course_id'] in existing]
+            try:
+                write_events(retry)
+                db.session.commit()
+                self.written += len(retry)
+                self.dropped += len(batch) - len(retry)
+            except Exception as e:
+                db.session.rollback()
+                self.dropped += len(batch)
+                logging.error(f"Dropped {len(batch)} learning events: {str(e)}")
+
+
+_event_queue = None
+_event_queue_lock = threading.Lock()
+
+
+def get_event_queue():
+    global _event_queue
+    if _event_queue is None:
+        with _event_queue_lock:
+            if _event_queue is None:
+                event_queue = EventQueue(
+                    current_app._get_current_object(),
+                    current_app.config['EVENT_BATCH_SIZE'],
+                    current_app.config['EVENT_FLUSH_SECONDS'],
+                    current_app.config['EVENT_QUEUE_MAX'],
+                )
+                event_queue.start()
+                _event_queue = event_queue
+    return _event_queue
+
+
+def record_event(user_id, course_id, event_type, value=None, **payload):
+    """Queue a learning event; never raises into the request."""
+    if not current_app.config['EVENT_LOG_ENABLED']:
+        return
+    try:
+        get_event_queue().put({
+            'user_id': user_id,
+            'course_id': course_id,
+            'event_type': event_type,
+            'value': value,
+            'payload': payload or None,
+            'created_at': datetime.utcnow(),
+        })
+    except Exception as e:
+        logging.error(f"Error recording {event_type} event: {str(e)}")
@@ -0,0 +1,199 @@
+import time
+import logging
+import threading
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, diags
+from sqlalchemy import func
+from database import db, read_replica
+
+
+class ItemSimilarityCache:
+    """Sparse users x courses progress matrix with a top-k item-item neighbor table.
+
+    The matrix is built from one aggregate query over ``user_course``.
+    Progress writes are recorded with ``record_progress`` and folded in on the
+    next read: only the neighbor rows of courses that share a user with a
+    touched course are recomputed. A full rebuild happens after ``max_age``
+    seconds so writes made by other processes are picked up. Readers take
+    the neighbor table outside the lock, so updates build new objects and
+    swap them in rather than changing the ones readers may hold.
+    """
+
+    def __init__(self, top_k=20, refresh_interval=30, max_age=3600, block_size=256):
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.block_size = block_size
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._matrix = None
+        self._user_positions = {}
+        self._course_positions = {}
+        self._course_ids = []
+        self._neighbor_indices = []
+        self._neighbor_values = []
+        self._neighbors = None
+        self._abs_sums = None
+        self._pending = {}
+        self._built_at = 0
+        self._refreshed_at = 0
+
+    def rebuild(self):
+        from models import Course, UserCourse
+        with read_replica():
+            rows = db.session.query(
+                UserCourse.user_id, UserCourse.course_id, func.max(UserCourse.progress)
+            ).group_by(UserCourse.user_id, UserCourse.course_id).all()
+            course_ids = [course_id for (course_id,) in db.session.query(Course.id).order_by(Course.id)]
+
+        with self._lock:
+            self._user_positions = {}
+            self._course_positions = {course_id: i for i, course_id in enumerate(course_ids)}
+            self._course_ids = list(course_ids)
+            row_idx, col_idx, values = [], [], []
+            for user_id, course_id, progress in rows:
+                row_idx.append(self._user_position(user_id))
+                col_idx.append(self._course_position(course_id))
+                values.append(progress or 0)
+            self._matrix = csc_matrix(
+                (np.asarray(values, dtype=np.float64), (row_idx, col_idx)),
+                shape=(len(self._user_positions), len(self._course_ids))
+            )
+            self._matrix.eliminate_zeros()
+            self._pending = {}
+            self._neighbor_indices = [None] * len(self._course_ids)
+            self._neighbor_values = [None] * len(self._course_ids)
+            self._recompute_rows(range(len(self._course_ids)))
+            self._built_at = self._refreshed_at = time.monotonic()
+            logging.info(f"Built item similarity cache: {self._matrix.shape[0]} users, {len(self._course_ids)} courses, {len(rows)} interactions")
+
+    def _user_position(self, user_id):
+        position = self._user_positions.get(user_id)
+        if position is None:
+            position = self._user_positions[user_id] = len(self._user_positions)
+        return position
+
+    def _course_position(self, course_id):
+        position = self._course_positions.get(course_id)
+        if position is None:
+            position = self._course_positions[course_id] = len(self._course_ids)
+            self._course_ids.append(course_id)
+            self._neighbor_indices.append(None)
+            self._neighbor_values.append(None)
+        return position
+
+    def _recompute_rows(self, positions):
+        positions = list(positions)
+        norms = np.sqrt(np.asarray(self._matrix.multiply(self._matrix).sum(axis=0)).ravel())
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        normalized = csc_matrix(self._matrix.multiply(inverse.reshape(1, -1)))
+        for start in range(0, len(positions), self.block_size):
+            block = positions[start:start + self.block_size]
+            similarities = csr_matrix(normalized[:, block].T @ normalized)
+            for i, position in enumerate(block):
+                row = similarities.getrow(i)
+                indices, values = row.indices, row.data
+                if len(values) > self.top_k:
+                    keep = np.argpartition(-values, self.top_k - 1)[:self.top_k]
+                    indices, values = indices[keep], values[keep]
+                self._neighbor_indices[position] = indices.astype(np.int64)
+                self._neighbor_values[position] = values.astype(np.float64)
+        self._rebuild_neighbor_table()
+
+    def _rebuild_neighbor_table(self):
+        n_courses = len(self._course_ids)
+        indices = [idx if idx is not None else np.zeros(0, dtype=np.int64) for idx in self._neighbor_indices]
+        values = [val if val is not None else np.zeros(0) for val in self._neighbor_values]
+        indptr = np.concatenate([[0], np.cumsum([len(idx) for idx in indices])])
+        table = csr_matrix(
+            (np.concatenate(values) if values else np.zeros(0),
+             np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+             indptr),
+            shape=(n_courses, n_courses)
+        )
+        self._abs_sums = np.asarray(abs(table).sum(axis=1)).ravel()
+        self._neighbors = table.tocsc()
+
+    def record_progress(self, user_id, course_id, progress):
+        with self._lock:
+            self._pending[(user_id, course_id)] = progress or 0
+
+    def _apply_pending(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        # Readers may hold the current position maps; extend copies
+        self._user_positions = dict(self._user_positions)
+        self._course_positions = dict(self._course_positions)
+        self._course_ids = list(self._course_ids)
+        row_idx, col_idx, values = [], [], []
+        for (user_id, course_id), progress in pending.items():
+            row_idx.append(self._user_position(user_id))
+            col_idx.append(self._course_position(course_id))
+            values.append(progress)
+        shape = (len(self._user_positions), len(self._course_ids))
+        current = self._matrix.tocoo()
+        previous = csc_matrix((current.data, (current.row, current.col)), shape=shape)
+        mask = csc_matrix((np.ones(len(values)), (row_idx, col_idx)), shape=shape)
+        changes = csc_matrix((np.asarray(values, dtype=np.float64), (row_idx, col_idx)), shape=shape)
+        matrix = csc_matrix(previous - previous.multiply(mask) + changes)
+        matrix.eliminate_zeros()
+
+        # A changed entry moves the changed course's norm and its overlap with every
+        # course its users rated, before or after the change; those rows are stale
+        changed = np.unique(col_idx)
+        users = np.union1d(previous[:, changed].indices, matrix[:, changed].indices)
+        dirty = np.union1d(changed, np.union1d(previous.tocsr()[users].indices, matrix.tocsr()[users].indices))
+        self._matrix = matrix
+        self._recompute_rows(dirty.tolist())
+        self._refreshed_at = time.monotonic()
+
+    def _is_stale(self):
+        return self._matrix is None or time.monotonic() - self._built_at > self.max_age
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._is_stale():
+            # One request rebuilds; the others wait for it and use the result
+            with self._rebuild_lock:
+                if self._is_stale():
+                    self.rebuild()
+        elif self._pending and now - self._refreshed_at > self.refresh_interval:
+            with self._lock:
+                self._apply_pending()
+
+    def scores(self, ratings, course_ids):
+        """Item-kNN scores for ``course_ids`` given a user's ``{course_id: progress}`` ratings."""
+        self._ensure_fresh()
+        with self._lock:
+            neighbors, abs_sums, positions = self._neighbors, self._abs_sums, self._course_positions
+        rated = [(positions[course_id], progress) for course_id, progress in ratings.items()
+                 if progress and course_id in positions and positions[course_id] < neighbors.shape[1]]
+        all_scores = np.zeros(neighbors.shape[0])
+        if rated:
+            columns = [position for position, _ in rated]
+            weights = np.asarray([progress for _, progress in rated], dtype=np.float64)
+            numerators = neighbors[:, columns] @ weights
+            all_scores = np.divide(numerators, abs_sums, out=np.zeros_like(numerators), where=abs_sums > 0)
+        targets = np.array([positions.get(course_id, -1) for course_id in course_ids], dtype=np.int64)
+        targets[targets >= len(all_scores)] = -1
+        scores = np.zeros(len(course_ids))
+        found = targets >= 0
+        scores[found] = all_scores[targets[found]]
+        return scores
+
+    def scores_matrix(self, ratings, course_ids):
+        """Batched ``scores``: ``ratings`` is a sparse users x ``course_ids`` progress
+        matrix; returns a dense users x courses array."""
+        self._ensure_fresh()
+        with self._lock:
+            neighbors, abs_sums, positions = self._neighbors, self._abs_sums, self._course_positions
+        n_cached = neighbors.shape[0]
+        targets = np.array([positions.get(course_id, -1) for course_id in course_ids], dtype=np.int64)
+        targets[targets >= n_cached] = -1
+        found = np.flatnonzero(targets >= 0)
+        # Maps catalog columns onto cache positions.
+        projection = csr_matrix((np.ones(len(found)), (found, targets[found])), shape=(len(course_ids), n_cached))
+        numerators = csr_matrix(ratings, dtype=np.float64) @ projection @ neighbors.T
+        inverse = np.divide(1.0, abs_sums, out=np.zeros_like(abs_sums), where=abs_sums > 0)
+        return np.asarray((numerators @ diags(inverse) @ projection.T).todense())
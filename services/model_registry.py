@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import joblib
+import numpy as np
+import sklearn
+
+
+class ModelRegistry:
+    """Versioned store for sets of fitted model artifacts.
+
+    Models that are used together (a vectorizer and the classifier fitted on
+    its output, a scaler and the regressor fitted on its output) are saved
+    as one set: ``<root>/<set>/<version>/`` holds one uncompressed joblib
+    file per model plus ``metadata.json``, and ``<root>/<set>/CURRENT`` names
+    the version to serve. Switching ``CURRENT`` switches every model in the
+    set at once, so a process never pairs artifacts from different
+    versions. Artifacts are loaded on first use with NumPy arrays
+    memory-mapped, so worker processes share the pages through the OS cache.
+    """
+
+    def __init__(self, root, mmap_mode='r'):
+        self.root = root
+        self.mmap_mode = mmap_mode
+        self.load_timings = {}
+        self._lock = threading.Lock()
+        self._loaded = {}
+
+    def _set_dir(self, set_name):
+        return os.path.join(self.root, set_name)
+
+    def current_version(self, set_name):
+        try:
+            with open(os.path.join(self._set_dir(set_name), 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self, set_name):
+        try:
+            return sorted(entry for entry in os.listdir(self._set_dir(set_name)) if entry != 'CURRENT')
+        except FileNotFoundError:
+            return []
+
+    def metadata(self, set_name, version=None):
+        version = version or self.current_version(set_name)
+        if version is None:
+            return None
+        with open(os.path.join(self._set_dir(set_name), version, 'metadata.json')) as f:
+            return json.load(f)
+
+    @contextmanager
+    def exclusive(self, set_name):
+        """Hold an exclusive lock on ``set_name`` across processes, e.g. to train it only once."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, f'{set_name}.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self, set_name, models, metadata=None, activate=True):
+        """Save ``{name: model}`` as a new version of ``set_name``."""
+        created_at = datetime.utcnow()
+        version = created_at.strftime('%Y%m%d%H%M%S%f')
+        version_dir = os.path.join(self._set_dir(set_name), version)
+        os.makedirs(version_dir)
+        artifacts = {}
+        for name, model in models.items():
+            path = os.path.join(version_dir, f'{name}.joblib')
+            joblib.dump(model, path)
+            with open(path, 'rb') as f:
+                artifacts[name] = {'sha256': hashlib.sha256(f.read()).hexdigest()}
+        info = {
+            'set': set_name,
+            'version': version,
+            'created_at': created_at.isoformat(),
+            'artifacts': artifacts,
+            'sklearn_version': sklearn.__version__,
+            'numpy_version': np.__version__,
+        }
+        info.update(metadata or {})
+        # Written last: a version directory without metadata.json is incomplete
+        with open(os.path.join(version_dir, 'metadata.json'), 'w') as f:
+            json.dump(info, f, indent=2)
+        if activate:
+            self.activate(set_name, version)
+        logging.info(f"Saved model set {set_name} version {version}: {', '.join(models)}")
+        return version
+
+    def activate(self, set_name, version):
+        pointer = os.path.join(self._set_dir(set_name), 'CURRENT')
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(pointer + '.tmp', pointer)
+        with self._lock:
+            self._loaded.pop(set_name, None)
+
+    def get(self, set_name):
+        """Return ``({name: model}, version)`` for the current version, or ``(None, None)``."""
+        loaded = self._loaded.get(set_name)
+        if loaded is not None:
+            return loaded
+        with self._lock:
+            loaded = self._loaded.get(set_name)
+            if loaded is not None:
+                return loaded
+            version = self.current_version(set_name)
+            if version is None:
+                return None, None
+            version_dir = os.path.join(self._set_dir(set_name), version)
+            models = {}
+            for name in self.metadata(set_name, version)['artifacts']:
+                start = time.perf_counter()
+                models[name] = joblib.load(os.path.join(version_dir, f'{name}.joblib'), mmap_mode=self.mmap_mode)
+                self.load_timings[name] = time.perf_counter() - start
+                logging.info(f"Loaded model artifact {name} version {version} in {self.load_timings[name] * 1000:.1f} ms")
+            self._loaded[set_name] = (models, version)
+            return self._loaded[set_name]
@@ -0,0 +1,40 @@
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, id)`` from a cursor made by ``encode_cursor``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, row_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(statement, created_at_column, id_column, cursor=None, limit=20):
+    """Newest-first page of ``statement`` after ``cursor``, ordered by (created_at, id).
+
+    One extra row is requested so the caller can tell whether another page
+    exists; pass the result rows to ``split_page``.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(created_at_column, id_column) < tuple_(created_at, row_id))
+    return statement.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows, limit, created_at_key='created_at', id_key='id'):
+    """``(rows, next_cursor)``; ``next_cursor`` is None on the last page."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_at_key), getattr(last, id_key))
@@ -0,0 +1,166 @@
+import atexit
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+
+class WriteBehindBuffer(ABC):
+    """Base for buffers whose ``flush`` runs on a background thread every
+    ``flush_interval`` seconds, on ``wake()``, and at interpreter exit."""
+
+    thread_name = 'write-behind-buffer'
+
+    def __init__(self, app, flush_interval, max_pending, chunk_size):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.flushed = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    @abstractmethod
+    def flush(self):
+        """Write everything pending; must be safe to call from any thread."""
+
+
+class ProgressBuffer(WriteBehindBuffer):
+    """Write-behind buffer that coalesces progress pings per (user, course).
+
+    ``add`` only touches memory; a background thread applies the summed
+    deltas every ``flush_interval`` seconds (or as soon as ``max_pending``
+    keys are waiting) with one batched UPDATE per ``chunk_size`` keys. Each
+    worker process has its own buffer; the UPDATEs are increments, so
+    buffers in different processes combine correctly. Pings still pending
+    when a process dies without running its exit handlers are lost.
+    """
+
+    thread_name = 'progress-buffer'
+
+    def __init__(self, app, flush_interval=5.0, max_pending=10000, chunk_size=1000):
+        super().__init__(app, flush_interval, max_pending, chunk_size)
+        self._pending = defaultdict(float)
+
+    def add(self, user_id, course_id, delta):
+        with self._lock:
+            self._pending[(user_id, course_id)] += delta
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.wake()
+
+    def pending_delta(self, user_id, course_id):
+        with self._lock:
+            return self._pending.get((user_id, course_id), 0)
+
+    def flush(self):
+        from database import db
+        from services.progress_service import apply_progress_deltas
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(float)
+            if not pending:
+                return
+            keys = list(pending)
+            with self.app.app_context():
+                for start in range(0, len(keys), self.chunk_size):
+                    chunk = {key: pending[key] for key in keys[start:start + self.chunk_size]}
+                    try:
+                        progress = apply_progress_deltas(chunk)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        logging.error(f"Error flushing {len(chunk)} buffered progress updates: {str(e)}")
+                        with self._lock:
+                            for key, delta in chunk.items():
+                                self._pending[key] += delta
+                        continue
+                    self.flushed += len(chunk)
+                    self._record(progress)
+            logging.info(f"Flushed {len(keys)} buffered progress updates")
+
+    def _record(self, progress):
+        from services.ai_service import get_item_similarity_cache
+        try:
+            cache = get_item_similarity_cache()
+            for (user_id, course_id), value in progress.items():
+                cache.record_progress(user_id, course_id, value)
+        except Exception as e:
+            logging.error(f"Error recording progress in item similarity cache: {str(e)}")
+
+
+class StudyTimeBuffer(WriteBehindBuffer):
+    """Collects study-time heartbeats as per-user minute buckets.
+
+    A heartbeat marks the current minute (server clock) as studied in its
+    course, so any number of heartbeats within one minute count once. The
+    background thread writes every user's minutes in batches per
+    ``chunk_size`` users; ``apply_study_minutes`` stores each minute as a
+    ``study_minute`` row and only counts the new ones, so minutes already
+    written by this or another process (or before a restart) are never
+    added twice, whatever order they arrive in.
+    """
+
+    thread_name = 'study-time-buffer'
+
+    def __init__(self, app, flush_interval=60.0, max_pending=10000, chunk_size=1000):
+        super().__init__(app, flush_interval, max_pending, chunk_size)
+        self._pending = defaultdict(dict)
+
+    def add(self, user_id, minute, course_id):
+        with self._lock:
+            # A minute spent on two course pages counts once, for the first one
+            self._pending[user_id].setdefault(minute, course_id)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.wake()
+
+    def flush(self):
+        from database import db
+        from services.progress_service import apply_study_minutes
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(dict)
+            if not pending:
+                return
+            users = list(pending)
+            with self.app.app_context():
+                for start in range(0, len(users), self.chunk_size):
+                    chunk = {user_id: pending[user_id] for user_id in users[start:start + self.chunk_size]}
+                    try:
+                        apply_study_minutes(chunk)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        logging.error(f"Error flushing study time for {len(chunk)} users: {str(e)}")
+                        with self._lock:
+                            for user_id, minutes in chunk.items():
+                                for minute, course_id in minutes.items():
+                                    self._pending[user_id].setdefault(minute, course_id)
+                        continue
+                    self.flushed += len(chunk)
+            logging.info(f"Flushed study time for {len(users)} users")
@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import Counter
+from flask import current_app
+from sqlalchemy import bindparam, case, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+_progress_buffer = None
+_progress_buffer_lock = threading.Lock()
+_study_time_buffer = None
+_study_time_buffer_lock = threading.Lock()
+
+
+def get_progress_buffer():
+    global _progress_buffer
+    if _progress_buffer is None:
+        with _progress_buffer_lock:
+            if _progress_buffer is None:
+                from services.progress_buffer import ProgressBuffer
+                buffer = ProgressBuffer(
+                    current_app._get_current_object(),
+                    current_app.config['PROGRESS_FLUSH_SECONDS'],
+                    current_app.config['PROGRESS_BUFFER_MAX_KEYS'],
+                )
+                buffer.start()
+                _progress_buffer = buffer
+    return _progress_buffer
+
+
+def get_study_time_buffer():
+    global _study_time_buffer
+    if _study_time_buffer is None:
+        with _study_time_buffer_lock:
+            if _study_time_buffer is None:
+                from services.progress_buffer import StudyTimeBuffer
+                buffer = StudyTimeBuffer(
+                    current_app._get_current_object(),
+                    current_app.config['STUDY_TIME_FLUSH_SECONDS'],
+                    current_app.config['STUDY_TIME_BUFFER_MAX_USERS'],
+                )
+                buffer.start()
+                _study_time_buffer = buffer
+    return _study_time_buffer
+
+
+def record_heartbeat(user_id, course_id, now=None):
+    """Mark the current minute as studied for ``user_id`` in ``course_id``; returns the epoch minute."""
+    minute = int((now if now is not None else time.time()) // 60)
+    get_study_time_buffer().add(user_id, minute, course_id)
+    return minute
+
+
+def _adjust_counters(user_id, enrollments=0, progress=0):
+    from models import User
+    db.session.execute(
+        update(User).where(User.id == user_id).values(
+            enrollment_count=User.enrollment_count + enrollments,
+            progress_sum=User.progress_sum + progress,
+        )
+    )
+
+
+def enroll(user_id, course_id, progress=0):
+    """Add a UserCourse row and bump the user's counters in the same transaction."""
+    from models import UserCourse
+    user_course = UserCourse(user_id=user_id, course_id=course_id, progress=progress)
+    db.session.add(user_course)
+    _adjust_counters(user_id, enrollments=1, progress=progress)
+    return user_course
+
+
+def enroll_once(user_id, course_id):
+    """Enroll unless already enrolled, safe against concurrent requests.
+
+    Returns ``(user_course, created)``; counters only move when a row was inserted.
+    """
+    from models import UserCourse
+    bind = db.session.get_bind(UserCourse.__mapper__)
+    upsert = UPSERT_INSERTS.get(bind.dialect.name)
+    if upsert is not None:
+        statement = upsert(UserCourse).values(user_id=user_id, course_id=course_id, progress=0).on_conflict_do_nothing(
+            index_elements=['user_id', 'course_id']
+        ).returning(UserCourse.id)
+        created = db.session.execute(statement).scalar_one_or_none() is not None
+        if created:
+            _adjust_counters(user_id, enrollments=1)
+        return UserCourse.query.filter_by(user_id=user_id, course_id=course_id).one(), created
+    user_course = UserCourse.query.filter_by(user_id=user_id, course_id=course_id).first()
+    if user_course is not None:
+        return user_course, False
+    return enroll(user_id, course_id), True
+
+
+def _clamped_progress(progress, delta):
+    progress = func.coalesce(progress, 0) + delta
+    return case((progress > 100, 100.0), (progress < 0, 0.0), else_=progress)
+
+
+def increment_progress(user_id, course_id, delta):
+    """Atomically add ``delta`` to an enrollment's progress, clamped to [0, 100].
+
+    The enrollment row is locked while it is updated, so concurrent pings
+    can't lose increments, and the old and new progress give the delta
+    actually applied, which is added to the user's ``progress_sum``.
+    Returns the new progress, or None when the user isn't enrolled.
+    """
+    from models import UserCourse
+    bind = db.session.get_bind(UserCourse.__mapper__)
+    locked = select(UserCourse.id, UserCourse.progress).where(
+        UserCourse.user_id == user_id, UserCourse.course_id == course_id
+    ).with_for_update()
+    if bind.dialect.name == 'postgresql':
+        # The locked subquery sees the row version being updated, so RETURNING has both values
+        previous_row = locked.subquery('previous')
+        row = db.session.execute(
+            update(UserCourse).where(UserCourse.id == previous_row.c.id).values(
+                progress=_clamped_progress(UserCourse.progress, delta)
+            ).returning(previous_row.c.progress, UserCourse.progress)
+        ).one_or_none()
+        if row is None:
+            return None
+        previous, progress = row
+    else:
+        row = db.session.execute(locked).one_or_none()
+        if row is None:
+            return None
+        previous = row.progress
+        progress = min(max((previous or 0) + delta, 0), 100)
+        db.session.execute(update(UserCourse).where(UserCourse.id == row.id).values(progress=progress))
+    applied = progress - (previous or 0)
+    if applied:
+        _adjust_counters(user_id, progress=applied)
+    return progress
+
+
+def apply_progress_deltas(deltas):
+    """Apply ``{(user_id, course_id): delta}`` with one batched UPDATE.
+
+    The enrollment rows are locked first (in id order, so concurrent
+    batches can't deadlock) and their new progress clamped to [0, 100];
+    each user's ``progress_sum`` then moves by the deltas actually applied,
+    as in ``increment_progress``. Returns ``{(user_id, course_id):
+    new_progress}`` for the rows that exist.
+    """
+    from models import UserCourse
+    if not deltas:
+        return {}
+    rows = db.session.execute(
+        select(UserCourse.id, UserCourse.user_id, UserCourse.course_id, UserCourse.progress).where(
+            tuple_(UserCourse.user_id, UserCourse.course_id).in_(list(deltas))
+        ).order_by(UserCourse.id).with_for_update()
+    ).all()
+    progress, updates, applied = {}, [], {}
+    for row_id, user_id, course_id, previous in rows:
+        value = min(max((previous or 0) + deltas[(user_id, course_id)], 0), 100)
+        progress[(user_id, course_id)] = value
+        updates.append({'key_id': row_id, 'progress': value})
+        applied[user_id] = applied.get(user_id, 0) + value - (previous or 0)
+    if updates:
+        table = UserCourse.__table__
+        db.session.execute(table.update().where(table.c.id == bindparam('key_id')), updates)
+    for user_id, delta in applied.items():
+        if delta:
+            _adjust_counters(user_id, progress=delta)
+    return progress
+
+
+def apply_study_minutes(minutes):
+    """Record ``{user_id: {minute: course_id}}`` heartbeat minutes and add them to total_study_time.
+
+    Minutes are epoch minutes. Each one is inserted as a ``study_minute``
+    row keyed by (user_id, minute), ignoring rows that already exist, and
+    only the rows actually inserted are added to ``total_study_time``. So
+    buffers in several processes may flush minutes in any order, and a
+    replayed flush adds nothing.
+    """
+    from models import StudyMinute, User
+    rows = [
+        {'user_id': user_id, 'minute': minute, 'course_id': course_id}
+        for user_id, user_minutes in minutes.items() for minute, course_id in user_minutes.items()
+    ]
+    if not rows:
+        return
+    table = StudyMinute.__table__
+    bind = db.session.get_bind(StudyMinute.__mapper__)
+    upsert = UPSERT_INSERTS.get(bind.dialect.name)
+    if upsert is not None:
+        statement = upsert(table).on_conflict_do_nothing(index_elements=['user_id', 'minute']).returning(table.c.user_id)
+        inserted = db.session.execute(statement, rows).scalars().all()
+    else:
+        existing = set(db.session.execute(
+            select(table.c.user_id, table.c.minute).where(
+                tuple_(table.c.user_id, table.c.minute).in_([(row['user_id'], row['minute']) for row in rows])
+            )
+        ).all())
+        rows = [row for row in rows if (row['user_id'], row['minute']) not in existing]
+        if rows:
+            db.session.execute(insert(table), rows)
+        inserted = [row['user_id'] for row in rows]
+    added = Counter(inserted)
+    if added:
+        users = User.__table__
+        db.session.execute(
+            users.update().where(users.c.id == bindparam('key_user_id')).values(
+                total_study_time=func.coalesce(users.c.total_study_time, 0) + bindparam('added')
+            ),
+            [{'key_user_id': user_id, 'added': count} for user_id, count in added.items()]
+        )
+
+
+def add_study_time(user_id, minutes):
+    from models import User
+    db.session.execute(
+        update(User).where(User.id == user_id).values(
+            total_study_time=func.coalesce(User.total_study_time, 0) + minutes
+        )
+    )
+
+
+def recount(user_ids=None):
+    """Recompute the denormalized counters from user_course, e.g. after bulk imports."""
+    from models import User, UserCourse
+    enrollment_count = select(func.count(UserCourse.id)).where(UserCourse.user_id == User.id).scalar_subquery()
+    progress_sum = select(func.coalesce(func.sum(UserCourse.progress), 0)).where(UserCourse.user_id == User.id).scalar_subquery()
+    statement = update(User).values(enrollment_count=enrollment_count, progress_sum=progress_sum)
+    if user_ids is not None:
+        statement = statement.where(User.id.in_(user_ids))
+    db.session.execute(statement.execution_options(synchronize_session=False))
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, User) and (user_ids is None or obj.id in user_ids):
+            db.session.expire(obj, ['enrollment_count', 'progress_sum'])
@@ -0,0 +1,49 @@
+import logging
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def init_query_counting(app):
+    """Count the SQL statements issued while handling each request.
+
+    The listener is attached to every engine (including read replicas), and
+    the running total is kept on ``flask.g`` so threads don't share counts.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+
+def query_budget(max_queries):
+    """Cap the number of SQL statements a view may issue, template rendering included.
+
+    Over-budget requests are logged, or raise ``QueryBudgetExceeded`` when
+    ``QUERY_BUDGET_STRICT`` is set (as ``check_query_budgets.py`` does).
+    The most recent measurement is left on ``g.query_budget_used``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            start = g.get('query_count', 0)
+            response = view(*args, **kwargs)
+            used = g.get('query_count', 0) - start
+            g.query_budget_used = (request.endpoint, used, max_queries)
+            if used > max_queries:
+                message = f"{request.endpoint} issued {used} queries (budget {max_queries})"
+                if current_app.config.get('QUERY_BUDGET_STRICT'):
+                    raise QueryBudgetExceeded(message)
+                logging.warning(message)
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
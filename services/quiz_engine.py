@@ -0,0 +1,195 @@
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert, select, update
+from database import db
+from services.event_log import record_event
+from services.progress_service import UPSERT_INSERTS
+
+# Encoded response for a missing answer or one that matches no option
+NO_ANSWER = -1
+
+
+def _normalize(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def iter_questions(questions):
+    """Yield ``(question_id, question)`` from a quiz's ``questions`` JSON.
+
+    Questions may be a mapping of id to question or a list (ids ``q1``,
+    ``q2``, ...). A question is either a plain string (free text, not
+    graded) or ``{"text", "options", "answer"}`` where ``answer`` is the
+    correct option's text or index.
+    """
+    items = questions.items() if isinstance(questions, dict) else ((f"q{number}", question) for number, question in enumerate(questions or [], 1))
+    for question_id, question in items:
+        yield str(question_id), question if isinstance(question, dict) else {'text': question}
+
+
+def public_questions(questions):
+    """Questions as served to learners: id, text and options, without answers."""
+    return [
+        {'id': question_id, 'text': question.get('text', ''), 'options': list(question.get('options') or [])}
+        for question_id, question in iter_questions(questions)
+    ]
+
+
+def compile_answer_key(questions):
+    """Precompute the grading key stored in ``Quiz.answer_key``.
+
+    Each gradable question's options are normalized (whitespace and case)
+    and mapped to indices, and its answer is stored as an option index, so
+    grading only has to look up indices and compare arrays.
+    """
+    question_ids, options, answers = [], [], []
+    for question_id, question in iter_questions(questions):
+        choices = [_normalize(option) for option in question.get('options') or []]
+        answer = question.get('answer')
+        if isinstance(answer, int) and not isinstance(answer, bool) and 0 <= answer < len(choices):
+            answer_index = answer
+        elif answer is not None and _normalize(answer) in choices:
+            answer_index = choices.index(_normalize(answer))
+        else:
+            continue
+        question_ids.append(question_id)
+        options.append(choices)
+        answers.append(answer_index)
+    return {'question_ids': question_ids, 'options': options, 'answers': answers}
+
+
+class CompiledQuiz:
+    """A quiz's answer key as arrays, for grading many submissions at once."""
+
+    def __init__(self, quiz_id, course_id, answer_key):
+        self.quiz_id = quiz_id
+        self.course_id = course_id
+        self.question_ids = answer_key['question_ids']
+        self.option_indices = [{option: index for index, option in enumerate(options)} for options in answer_key['options']]
+        self.answers = np.asarray(answer_key['answers'], dtype=np.int16)
+
+    @property
+    def gradable(self):
+        return len(self.question_ids) > 0
+
+    def encode(self, answers):
+        """One submission (``{question_id: option text or index}``) as a row of option indices."""
+        row = np.full(len(self.question_ids), NO_ANSWER, dtype=np.int16)
+        for position, (question_id, indices) in enumerate(zip(self.question_ids, self.option_indices)):
+            response = answers.get(question_id)
+            if isinstance(response, int) and not isinstance(response, bool):
+                if 0 <= response < len(indices):
+                    row[position] = response
+            elif response is not None:
+                row[position] = indices.get(_normalize(response), NO_ANSWER)
+        return row
+
+    def grade(self, submissions):
+        """``(scores, correct)`` for a list of answer dicts: percentages and the submissions x questions hit matrix."""
+        responses = np.vstack([self.encode(answers) for answers in submissions])
+        correct = responses == self.answers
+        return correct.mean(axis=1) * 100, correct
+
+
+def compiled_quizzes(quiz_ids):
+    """``{quiz_id: CompiledQuiz}``, compiling (and storing) keys missing from quizzes written without the ORM."""
+    from models import Quiz
+    rows = db.session.execute(
+        select(Quiz.id, Quiz.course_id, Quiz.questions, Quiz.answer_key).where(Quiz.id.in_(set(quiz_ids)))
+    ).all()
+    compiled = {}
+    for quiz_id, course_id, questions, answer_key in rows:
+        if answer_key is None:
+            answer_key = compile_answer_key(questions)
+            db.session.execute(update(Quiz).where(Quiz.id == quiz_id).values(answer_key=answer_key))
+        compiled[quiz_id] = CompiledQuiz(quiz_id, course_id, answer_key)
+    return compiled
+
+
+def _update_question_stats(attempts, correct):
+    """Add ``{(quiz_id, question_id): count}`` attempts and correct answers to QuizQuestionStat."""
+    from models import QuizQuestionStat
+    if not attempts:
+        return
+    table = QuizQuestionStat.__table__
+    rows = [
+        {'quiz_id': quiz_id, 'question_id': question_id, 'attempts': count, 'correct': correct.get((quiz_id, question_id), 0)}
+        for (quiz_id, question_id), count in attempts.items()
+    ]
+    upsert = UPSERT_INSERTS.get(db.session.get_bind(QuizQuestionStat.__mapper__).dialect.name)
+    if upsert is not None:
+        statement = upsert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['quiz_id', 'question_id'],
+            set_={
+                'attempts': table.c.attempts + statement.excluded.attempts,
+                'correct': table.c.correct + statement.excluded.correct,
+            },
+        )
+        db.session.execute(statement, rows)
+        return
+    for row in rows:
+        updated = db.session.execute(
+            update(table).where(table.c.quiz_id == row['quiz_id'], table.c.question_id == row['question_id']).values(
+                attempts=table.c.attempts + row['attempts'], correct=table.c.correct + row['correct']
+            )
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(table).values(**row))
+
+
+def grade_submissions(submissions, quizzes=None, events=None):
+    """Grade ``[(user_id, quiz_id, answers), ...]`` in the caller's transaction.
+
+    Submissions are grouped by quiz and each group is graded with one
+    vectorized comparison. Results are inserted with one executemany and
+    per-question statistics are updated in the same transaction. Quizzes
+    with only free-text questions are accepted without a score, as before
+    answer keys existed; their answers are kept in the learning event.
+    quiz_submission events are queued with ``record_event``, or appended
+    to ``events`` for a caller that writes its own batch. ``quizzes`` may
+    be a ``compiled_quizzes`` result the caller already loaded. Returns one
+    score per submission, or None for unknown quizzes and quizzes without
+    gradable questions.
+    """
+    from models import UserQuizResult
+    if not submissions:
+        return []
+    if quizzes is None:
+        quizzes = compiled_quizzes(quiz_id for _, quiz_id, _ in submissions)
+    by_quiz = defaultdict(list)
+    for index, (_, quiz_id, _) in enumerate(submissions):
+        if quiz_id in quizzes and quizzes[quiz_id].gradable:
+            by_quiz[quiz_id].append(index)
+
+    scores = [None] * len(submissions)
+    attempts, correct_counts = {}, {}
+    for quiz_id, indices in by_quiz.items():
+        quiz = quizzes[quiz_id]
+        group_scores, correct = quiz.grade([submissions[index][2] for index in indices])
+        for index, score in zip(indices, group_scores):
+            scores[index] = round(float(score), 2)
+        for question_id, hits in zip(quiz.question_ids, correct.sum(axis=0)):
+            attempts[(quiz_id, question_id)] = len(indices)
+            correct_counts[(quiz_id, question_id)] = int(hits)
+
+    now = datetime.utcnow()
+    graded = [(submission, score) for submission, score in zip(submissions, scores) if score is not None]
+    if graded:
+        db.session.execute(insert(UserQuizResult.__table__), [
+            {'user_id': user_id, 'quiz_id': quiz_id, 'score': score} for (user_id, quiz_id, _), score in graded
+        ])
+    quiz_events = []
+    for (user_id, quiz_id, answers), score in zip(submissions, scores):
+        if quiz_id not in quizzes:
+            continue
+        payload = {'quiz_id': quiz_id} if score is not None else {'quiz_id': quiz_id, 'answers': answers}
+        quiz_events.append({'user_id': user_id, 'course_id': quizzes[quiz_id].course_id, 'event_type': 'quiz_submission',
+                            'value': score, 'payload': payload, 'created_at': now})
+    if events is None:
+        for event in quiz_events:
+            record_event(event['user_id'], event['course_id'], event['event_type'], event['value'], **event['payload'])
+    else:
+        events.extend(quiz_events)
+    _update_question_stats(attempts, correct_counts)
+    return scores
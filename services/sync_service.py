@@ -0,0 +1,129 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert, select
+from database import db
+from services.event_log import write_events
+from services.progress_service import apply_progress_deltas
+from services.quiz_engine import compiled_quizzes, grade_submissions
+
+SYNC_ACTION_TYPES = ('progress', 'feedback', 'quiz_submission')
+MAX_PROGRESS_DELTA = 100
+
+
+def _rejected(key, error):
+    return {'key': key, 'status': 'rejected', 'error': error}
+
+
+def _validate(action, courses, quizzes):
+    """Error message for an action that cannot be applied, or None."""
+    action_type = action.get('type')
+    if action_type not in SYNC_ACTION_TYPES:
+        return f"Unknown action type: {action_type!r}"
+    if action_type == 'quiz_submission':
+        if action.get('quiz_id') not in quizzes:
+            return 'Unknown quiz'
+        if not isinstance(action.get('answers'), dict):
+            return 'answers must be an object'
+        return None
+    if action.get('course_id') not in courses:
+        return 'Unknown course'
+    if action_type == 'progress':
+        delta = action.get('delta')
+        if isinstance(delta, bool) or not isinstance(delta, (int, float)) or abs(delta) > MAX_PROGRESS_DELTA:
+            return f"delta must be a number between -{MAX_PROGRESS_DELTA} and {MAX_PROGRESS_DELTA}"
+    return None
+
+
+def apply_sync_actions(user_id, actions):
+    """Apply a batch of queued offline actions for ``user_id`` in the caller's transaction.
+
+    Every action carries a client-generated ``key``. Keys already recorded
+    in ``sync_action`` (or repeated within the batch) are not applied
+    again; the original result is returned with ``duplicate: True``. Progress deltas for all actions are
+    applied with ``apply_progress_deltas``: one batched UPDATE of the locked
+    enrollment rows, with ``progress_sum`` moved by the deltas actually
+    applied rather than re-summed. Quiz submissions are graded together
+    with ``grade_submissions``, and the resulting learning events are
+    written in the same transaction. Returns
+    ``(results, progress)``: one result per action, in order, and
+    ``{(user_id, course_id): new_progress}``. A concurrent replay of the same
+    keys makes the commit fail on the unique index; retry the batch then.
+    """
+    from models import Course, SyncAction
+    keys = [action.get('key') for action in actions if isinstance(action, dict) and isinstance(action.get('key'), str)]
+    recorded = {}
+    if keys:
+        rows = db.session.execute(
+            select(SyncAction.key, SyncAction.result).where(SyncAction.user_id == user_id, SyncAction.key.in_(keys))
+        )
+        recorded = {key: result for key, result in rows}
+
+    course_ids = {action.get('course_id') for action in actions if isinstance(action, dict) and isinstance(action.get('course_id'), int)}
+    quiz_ids = {action.get('quiz_id') for action in actions if isinstance(action, dict) and isinstance(action.get('quiz_id'), int)}
+    courses = set(db.session.scalars(select(Course.id).where(Course.id.in_(course_ids)))) if course_ids else set()
+    quizzes = compiled_quizzes(quiz_ids) if quiz_ids else {}
+
+    results = [None] * len(actions)
+    accepted = []
+    first_index = {}
+    for index, action in enumerate(actions):
+        key = action.get('key') if isinstance(action, dict) else None
+        if not isinstance(key, str) or not 0 < len(key) <= 64:
+            results[index] = _rejected(key, 'key must be a string of 1 to 64 characters')
+        elif key in recorded:
+            results[index] = dict(recorded[key], duplicate=True)
+        elif key not in first_index:
+            first_index[key] = index
+            error = _validate(action, courses, quizzes)
+            if error:
+                results[index] = _rejected(key, error)
+            else:
+                accepted.append(index)
+
+    deltas = defaultdict(float)
+    for index in accepted:
+        if actions[index]['type'] == 'progress':
+            deltas[(user_id, actions[index]['course_id'])] += actions[index]['delta']
+    progress = apply_progress_deltas(dict(deltas))
+
+    now = datetime.utcnow()
+    events = []
+    submissions = [index for index in accepted if actions[index]['type'] == 'quiz_submission']
+    scores = grade_submissions(
+        [(user_id, actions[index]['quiz_id'], actions[index]['answers']) for index in submissions], quizzes, events
+    )
+    scores = dict(zip(submissions, scores))
+    for index in accepted:
+        action = actions[index]
+        key = action['key']
+        if action['type'] == 'progress':
+            value = progress.get((user_id, action['course_id']))
+            if value is None:
+                results[index] = _rejected(key, 'Not enrolled in this course')
+                continue
+            results[index] = {'key': key, 'status': 'applied', 'progress': value}
+            events.append({'user_id': user_id, 'course_id': action['course_id'], 'event_type': 'progress',
+                           'value': action['delta'], 'payload': {'progress': value, 'offline': True}, 'created_at': now})
+        elif action['type'] == 'feedback':
+            results[index] = {'key': key, 'status': 'applied'}
+            events.append({'user_id': user_id, 'course_id': action['course_id'], 'event_type': 'feedback',
+                           'payload': {field: action.get(field) for field in ('difficulty', 'engagement', 'feedback')},
+                           'created_at': now})
+        elif scores[index] is None:
+            results[index] = {'key': key, 'status': 'accepted'}
+        else:
+            results[index] = {'key': key, 'status': 'applied', 'score': scores[index]}
+    write_events(events)
+    for index, action in enumerate(actions):
+        if results[index] is None:
+            results[index] = dict(results[first_index[action['key']]], duplicate=True)
+
+    # Rejections are recorded too, so a replay gets the same answer
+    new_rows = [
+        {'user_id': user_id, 'key': actions[index]['key'], 'action_type': str(actions[index].get('type'))[:32],
+         'payload': actions[index], 'result': results[index], 'created_at': now}
+        for index in first_index.values()
+    ]
+    if new_rows:
+        db.session.execute(insert(SyncAction.__table__), new_rows)
+    return results, progress
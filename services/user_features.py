@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import func, literal, select, union_all
+from database import db
+
+
+class UserFeatures:
+    """Per-request snapshot of everything personalization reads about a user.
+
+    ``load`` fetches the user's course progress and per-course quiz averages
+    in a single UNION ALL query; the personalization functions in
+    ``services.ai_service`` accept the snapshot instead of walking
+    ``user.user_courses`` or re-querying quiz results.
+    """
+
+    def __init__(self, user, progress_rows, quiz_averages):
+        from models import User
+        self.user_id = user.id
+        self.learning_style = user.learning_style
+        self.last_login = user.last_login
+        self.total_study_time = user.total_study_time
+        self.progress_rows = progress_rows
+        self.quiz_averages = quiz_averages
+
+        self.progress = {}
+        for course_id, progress in progress_rows:
+            self.progress.setdefault(course_id, progress)
+        self.enrollment_count = user.enrollment_count or 0
+        self.progress_sum = user.progress_sum or 0
+        self.average_performance = User.compute_average_performance(self.enrollment_count, self.progress_sum)
+        self.engagement_score = User.compute_engagement_score(self.enrollment_count, self.total_study_time, self.last_login)
+        self.learning_pace = User.compute_learning_pace(self.enrollment_count, self.progress_sum, self.total_study_time)
+
+    @classmethod
+    def load(cls, user):
+        return cls.load_many([user])[user.id]
+
+    @classmethod
+    def load_many(cls, users):
+        """Snapshots for several users from the same single query, keyed by user id."""
+        from models import UserCourse, UserQuizResult, Quiz
+        user_ids = [user.id for user in users]
+        progress_query = select(
+            literal('progress').label('kind'), UserCourse.user_id, UserCourse.course_id, UserCourse.progress.label('value')
+        ).where(UserCourse.user_id.in_(user_ids))
+        quiz_query = select(
+            literal('quiz').label('kind'), UserQuizResult.user_id, Quiz.course_id, func.avg(UserQuizResult.score).label('value')
+        ).join(Quiz, UserQuizResult.quiz_id == Quiz.id).where(
+            UserQuizResult.user_id.in_(user_ids)
+        ).group_by(UserQuizResult.user_id, Quiz.course_id)
+
+        progress_rows = {user_id: [] for user_id in user_ids}
+        quiz_averages = {user_id: {} for user_id in user_ids}
+        for kind, user_id, course_id, value in db.session.execute(union_all(progress_query, quiz_query)):
+            if kind == 'progress':
+                progress_rows[user_id].append((course_id, value))
+            else:
+                quiz_averages[user_id][course_id] = value
+        return {user.id: cls(user, progress_rows[user.id], quiz_averages[user.id]) for user in users}
+
+    def is_enrolled(self, course_id):
+        return course_id in self.progress
+
+    def course_progress(self, course_id, default=0):
+        return self.progress.get(course_id, default)
+
+    def ratings(self):
+        ratings = {}
+        for course_id, progress in self.progress_rows:
+            ratings[course_id] = max(ratings.get(course_id, 0), progress or 0)
+        return ratings
+
+    def hours_since_login(self):
+        if self.last_login is None:
+            return None
+        return (datetime.utcnow() - self.last_login).total_seconds() / 3600
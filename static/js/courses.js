@@ -20,18 +20,21 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// The catalog is kept in localStorage and brought up to date by /api/sync, which
+// only returns courses changed since the last sync. Full courses (with their
+// ETags) are kept in IndexedDB and revalidated with If-None-Match, so an
+// unchanged course costs a 304 with no body.
 async function loadCourses() {
     try {
-        const response = await fetch('/courses');
-        if (response.ok) {
-            const courses = await response.json();
-            displayCourses(courses);
-            courses.forEach(saveCourseOffline);
-        } else {
-            console.log('Failed to fetch courses from server. Loading offline courses.');
-            const offlineCourses = await loadOfflineCourses();
-            displayCourses(offlineCourses);
+        let courses;
+        try {
+            courses = await syncOfflineActions();
+        } catch (error) {
+            console.log('Failed to sync courses with the server. Loading offline courses.', error);
+            const cached = JSON.parse(localStorage.getItem(COURSE_CATALOG_KEY) || 'null');
+            courses = cached ? cached.courses : await loadOfflineCourses();
         }
+        displayCourses(courses);
     } catch (error) {
         console.error('Error loading courses:', error);
         showMessage('Failed to load courses', 'error');
@@ -59,21 +62,48 @@ function displayCourses(courses) {
     saveOfflineButtons.forEach(button => {
         button.addEventListener('click', function(event) {
             const courseId = event.target.getAttribute('data-course-id');
-            const course = courses.find(c => c.id == courseId);
-            if (course) {
-                saveCourseOffline(course);
-            }
+            fetchCourse(courseId).catch(error => {
+                console.error('Error saving course offline:', error);
+                showMessage('Failed to save course for offline use', 'error');
+            });
         });
     });
 }
 
+// Returns the course, revalidating the IndexedDB copy and saving it when it
+// changed. Falls back to the saved copy when offline; resolves to null if the
+// server could not provide the course.
+async function fetchCourse(courseId) {
+    const offlineCourses = await loadOfflineCourses().catch(() => []);
+    const offlineCourse = offlineCourses.find(c => c.id == courseId);
+    const headers = offlineCourse && offlineCourse.etag ? { 'If-None-Match': offlineCourse.etag } : {};
+    let response;
+    try {
+        response = await fetch(`/api/courses/${courseId}`, { headers: headers });
+    } catch (error) {
+        // Offline: fall back to the saved copy
+        if (offlineCourse) {
+            return offlineCourse;
+        }
+        throw error;
+    }
+    if (response.status === 304 && offlineCourse) {
+        return offlineCourse;
+    }
+    if (!response.ok) {
+        return null;
+    }
+    const course = await response.json();
+    course.etag = response.headers.get('ETag');
+    saveCourseOffline(course);
+    return course;
+}
+
 async function loadCourseContent(courseId) {
     try {
-        const response = await fetch(`/courses/${courseId}`);
-        if (response.ok) {
-            const content = await response.json();
+        const content = await fetchCourse(courseId);
+        if (content) {
             displayCourseContent(content);
-            saveCourseOffline(content);
         } else {
             console.log('Failed to fetch course content from server. Loading offline content.');
             const offlineCourses = await loadOfflineCourses();
@@ -94,7 +124,7 @@ function displayCourseContent(content) {
     const courseDetail = document.getElementById('course-detail');
     courseDetail.innerHTML = `
         <h2>${content.title}</h2>
-        <div class="course-content">${content.content}</div>
+        <div class="course-content">${content.content_html}</div>
         <div class="course-progress">Progress: ${content.progress}%</div>
         <a href="/courses/${content.id}/quiz" class="btn">Take Quiz</a>
     `;
@@ -102,7 +132,7 @@ function displayCourseContent(content) {
 
 async function loadQuiz(courseId) {
     try {
-        const response = await fetch(`/courses/${courseId}/quiz`);
+        const response = await fetch(`/courses/${courseId}/quiz`, { headers: { 'Accept': 'application/json' } });
         if (response.ok) {
             const quiz = await response.json();
             displayQuiz(quiz);
@@ -120,15 +150,15 @@ function displayQuiz(quiz) {
     quizContainer.innerHTML = `
         <h2>${quiz.title}</h2>
         <form id="quiz-form">
-            ${quiz.questions.map((question, index) => `
+            ${quiz.questions.map(question => `
                 <div class="question">
                     <p>${question.text}</p>
-                    ${question.options.map(option => `
+                    ${question.options.length ? question.options.map(option => `
                         <label>
-                            <input type="radio" name="q${index}" value="${option}">
+                            <input type="radio" name="${question.id}" value="${option}">
                             ${option}
                         </label>
-                    `).join('')}
+                    `).join('') : `<textarea name="${question.id}" rows="3"></textarea>`}
                 </div>
             `).join('')}
             <button type="submit" class="btn">Submit Quiz</button>
@@ -137,11 +167,11 @@ function displayQuiz(quiz) {
 
     document.getElementById('quiz-form').addEventListener('submit', event => {
         event.preventDefault();
-        submitQuiz(quiz.id);
+        submitQuiz(quiz.course_id, quiz.id);
     });
 }
 
-async function submitQuiz(quizId) {
+async function submitQuiz(courseId, quizId) {
     const form = document.getElementById('quiz-form');
     const formData = new FormData(form);
     const answers = {};
@@ -151,12 +181,12 @@ async function submitQuiz(quizId) {
     }
 
     try {
-        const response = await fetch(`/courses/${quizId}/quiz/submit`, {
+        const response = await fetch(`/courses/${courseId}/quiz/submit`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify(answers),
+            body: JSON.stringify({ quiz_id: quizId, answers: answers }),
         });
 
         if (response.ok) {
@@ -168,8 +198,7 @@ async function submitQuiz(quizId) {
     } catch (error) {
         console.error('Error submitting quiz:', error);
         showMessage('Failed to submit quiz. It will be submitted when you\'re back online.', 'warning');
-        // Store the quiz answers locally for later submission
-        localStorage.setItem(`quiz_${quizId}_answers`, JSON.stringify(answers));
+        queueSyncAction({ type: 'quiz_submission', quiz_id: Number(quizId), answers: answers });
     }
 }
 
@@ -177,27 +206,8 @@ function showQuizResult(result) {
     const quizContainer = document.getElementById('quiz-container');
     quizContainer.innerHTML = `
         <h2>Quiz Result</h2>
-        <p>Your score: ${result.score}%</p>
+        <p>${result.graded ? `Your score: ${result.score}%` : 'Your answers have been submitted.'}</p>
         <p>Course progress: ${result.progress}%</p>
         <a href="/dashboard" class="btn">Back to Dashboard</a>
     `;
 }
-
-// Function to check for and submit stored quiz answers when online
-function submitStoredQuizzes() {
-    if (navigator.onLine) {
-        for (let i = 0; i < localStorage.length; i++) {
-            const key = localStorage.key(i);
-            if (key.startsWith('quiz_') && key.endsWith('_answers')) {
-                const quizId = key.split('_')[1];
-                const answers = JSON.parse(localStorage.getItem(key));
-                submitQuiz(quizId, answers);
-                localStorage.removeItem(key);
-            }
-        }
-    }
-}
-
-// Check for stored quizzes to submit when the page loads and when coming back online
-window.addEventListener('load', submitStoredQuizzes);
-window.addEventListener('online', submitStoredQuizzes);
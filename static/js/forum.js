@@ -0,0 +1,73 @@
+// Forum infinite scroll: appends the next keyset page when "Load more" comes into view
+
+document.addEventListener('DOMContentLoaded', function() {
+    const loadMore = document.getElementById('forum-load-more');
+    const postList = document.getElementById('forum-post-list');
+    if (!loadMore || !postList || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    let loading = false;
+    const observer = new IntersectionObserver(async function(entries) {
+        if (!entries.some(entry => entry.isIntersecting) || loading) {
+            return;
+        }
+        loading = true;
+        try {
+            const response = await fetch(loadMore.dataset.url);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const page = await response.json();
+            page.posts.forEach(post => postList.appendChild(renderForumPost(post)));
+            if (page.next_cursor) {
+                loadMore.dataset.url = withCursor(loadMore.dataset.url, page.next_cursor);
+                loadMore.href = withCursor(loadMore.href, page.next_cursor);
+            } else {
+                observer.disconnect();
+                loadMore.remove();
+            }
+        } catch (error) {
+            console.error('Error loading forum posts:', error);
+            observer.disconnect();
+        } finally {
+            loading = false;
+        }
+    });
+    observer.observe(loadMore);
+});
+
+function withCursor(url, cursor) {
+    const next = new URL(url, window.location.origin);
+    next.searchParams.set('cursor', cursor);
+    return next.pathname + next.search;
+}
+
+function formatTimestamp(value) {
+    return value ? value.replace('T', ' ').split('.')[0] : '';
+}
+
+function renderForumPost(post) {
+    const card = document.createElement('div');
+    card.className = 'forum-post-card';
+
+    const heading = document.createElement('h3');
+    const link = document.createElement('a');
+    link.href = post.url;
+    link.textContent = post.title;
+    heading.appendChild(link);
+    card.appendChild(heading);
+
+    [
+        `Author: ${post.author || ''}`,
+        `Course: ${post.course_title || ''}`,
+        `Created: ${formatTimestamp(post.created_at)}`,
+        `Replies: ${post.reply_count}`,
+        `Last activity: ${formatTimestamp(post.last_activity)}`,
+    ].forEach(text => {
+        const line = document.createElement('p');
+        line.textContent = text;
+        card.appendChild(line);
+    });
+    return card;
+}
@@ -4,6 +4,13 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize any common elements or event listeners here
     initNavigation();
     initOfflineStorage();
+    if (navigator.onLine && pendingSyncActions().length) {
+        syncOfflineActions().catch(error => console.log('Offline sync failed:', error));
+    }
+});
+
+window.addEventListener('online', function() {
+    syncOfflineActions().catch(error => console.log('Offline sync failed:', error));
 });
 
 function initNavigation() {
@@ -117,4 +124,85 @@ function loadOfflineCourses() {
     });
 }
 
+// Actions taken offline (progress, feedback, quiz submissions) are queued in
+// localStorage with an idempotency key and sent to /api/sync in one request;
+// the server skips keys it has already applied, so replays are harmless.
+const SYNC_QUEUE_KEY = 'syncQueue';
+const COURSE_CATALOG_KEY = 'courseCatalog';
+const SYNC_BATCH_SIZE = 500;
+let syncInFlight = null;
+
+function newSyncKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
+function pendingSyncActions() {
+    // Quiz answers stored by earlier versions of this app
+    for (let i = localStorage.length - 1; i >= 0; i--) {
+        const key = localStorage.key(i);
+        if (key && key.startsWith('quiz_') && key.endsWith('_answers')) {
+            const quizId = Number(key.split('_')[1]);
+            const answers = JSON.parse(localStorage.getItem(key));
+            localStorage.removeItem(key);
+            queueSyncAction({ type: 'quiz_submission', quiz_id: quizId, answers: answers });
+        }
+    }
+    return JSON.parse(localStorage.getItem(SYNC_QUEUE_KEY) || '[]');
+}
+
+function queueSyncAction(action) {
+    const queue = JSON.parse(localStorage.getItem(SYNC_QUEUE_KEY) || '[]');
+    queue.push(Object.assign({ key: newSyncKey() }, action));
+    localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(queue));
+}
+
+// Sends queued actions and merges course changes into the saved catalog.
+// Resolves to the up-to-date catalog.
+function syncOfflineActions() {
+    if (!syncInFlight) {
+        syncInFlight = sendSyncBatch().finally(() => {
+            syncInFlight = null;
+        });
+    }
+    return syncInFlight;
+}
+
+async function sendSyncBatch() {
+    const batch = pendingSyncActions().slice(0, SYNC_BATCH_SIZE);
+    const catalog = JSON.parse(localStorage.getItem(COURSE_CATALOG_KEY) || 'null');
+    const response = await fetch('/api/sync', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ actions: batch, cursor: catalog ? catalog.cursor : null }),
+    });
+    if (!response.ok) {
+        throw new Error(`Sync failed with status ${response.status}`);
+    }
+    const data = await response.json();
+
+    // Every result acknowledges its action, rejections included
+    const done = new Set(data.results.map(result => result.key));
+    const remaining = pendingSyncActions().filter(action => !done.has(action.key));
+    localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(remaining));
+    data.results
+        .filter(result => result.status === 'rejected' && !result.duplicate)
+        .forEach(result => console.warn('Offline action rejected:', result.key, result.error));
+
+    const courses = new Map((catalog ? catalog.courses : []).map(course => [course.id, course]));
+    data.courses.changed.forEach(course => courses.set(course.id, course));
+    const ids = new Set(data.courses.ids);
+    const merged = Array.from(courses.values()).filter(course => ids.has(course.id)).sort((a, b) => a.id - b.id);
+    localStorage.setItem(COURSE_CATALOG_KEY, JSON.stringify({ cursor: data.courses.cursor, courses: merged }));
+
+    if (remaining.length && batch.length === SYNC_BATCH_SIZE) {
+        return sendSyncBatch();
+    }
+    return merged;
+}
+
 // Add more common functions as needed
@@ -1,42 +1,170 @@
-const CACHE_NAME = 'learn-ai-cache-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/styles.css',
-  '/static/js/main.js',
-  '/static/manifest.json',
-  '/offline'
-];
+// Precache manifest ([{url, revision}]) injected by the server; see serve_service_worker in main.py.
+// It changes whenever a precached file changes, which makes the browser install this worker again.
+const PRECACHE_MANIFEST = self.__PRECACHE_MANIFEST || [];
+
+const PRECACHE_NAME = 'learn-ai-precache';
+const CONTENT_CACHE_NAME = 'learn-ai-content-v1';
+const PAGES_CACHE_NAME = 'learn-ai-pages-v1';
+const STATIC_CACHE_NAME = 'learn-ai-static-v1';
+const CURRENT_CACHES = [PRECACHE_NAME, CONTENT_CACHE_NAME, PAGES_CACHE_NAME, STATIC_CACHE_NAME];
+
+// Caches holding per-user responses, cleared on logout
+const USER_CACHES = [CONTENT_CACHE_NAME, PAGES_CACHE_NAME];
+
+// Static files named with a content hash by build_assets.py never change
+const FINGERPRINTED_ASSET = /^\/static\/.+\.[0-9a-f]{12}\.\w+$/;
+// Course content is served from cache while it is refreshed in the background
+const STALE_WHILE_REVALIDATE_ROUTES = [/^\/courses\/\d+$/, /^\/api\/courses(\/\d+)?$/];
+// Pages that must be current when online; cached copies are only an offline fallback
+const NETWORK_FIRST_ROUTES = [/^\/$/, /^\/dashboard$/, /^\/progress$/, /^\/courses$/, /^\/courses\/\d+\/panels\//, /^\/forum/, /^\/study_groups/];
+// Never cached
+const NETWORK_ONLY_ROUTES = [/^\/login$/, /^\/logout$/, /^\/register$/];
+
+// Precached responses are stored under the URL plus its revision, so an unchanged
+// file keeps its entry across releases and only changed files are downloaded again
+function precacheKey(entry) {
+  const url = new URL(entry.url, self.location.origin);
+  url.searchParams.set('__revision', entry.revision);
+  return url.href;
+}
+
+const precacheKeys = new Map(
+  PRECACHE_MANIFEST.map((entry) => [new URL(entry.url, self.location.origin).href, precacheKey(entry)])
+);
 
 self.addEventListener('install', (event) => {
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then((cache) => cache.addAll(urlsToCache))
-  );
-});
-
-self.addEventListener('fetch', (event) => {
-  event.respondWith(
-    caches.match(event.request)
-      .then((response) => {
-        if (response) {
-          return response;
-        }
-        return fetch(event.request).catch(() => caches.match('/offline'));
+    caches.open(PRECACHE_NAME).then((cache) => Promise.all(
+      PRECACHE_MANIFEST.map((entry) => {
+        const key = precacheKey(entry);
+        return cache.match(key).then((cached) => {
+          if (cached) {
+            return null;
+          }
+          // Without cookies, so the precached offline page never shows one user's navigation to another
+          return fetch(entry.url, { cache: 'no-cache', credentials: 'omit' }).then((response) => {
+            if (!response.ok) {
+              throw new Error(`Precaching ${entry.url} failed with status ${response.status}`);
+            }
+            return cache.put(key, response);
+          });
+        });
       })
+    )).then(() => self.skipWaiting())
   );
 });
 
 self.addEventListener('activate', (event) => {
-  const cacheWhitelist = [CACHE_NAME];
+  const currentKeys = new Set(precacheKeys.values());
   event.waitUntil(
-    caches.keys().then((cacheNames) => {
-      return Promise.all(
-        cacheNames.map((cacheName) => {
-          if (cacheWhitelist.indexOf(cacheName) === -1) {
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    })
+    caches.keys()
+      .then((cacheNames) => Promise.all(
+        cacheNames
+          .filter((cacheName) => CURRENT_CACHES.indexOf(cacheName) === -1)
+          .map((cacheName) => caches.delete(cacheName))
+      ))
+      .then(() => caches.open(PRECACHE_NAME))
+      .then((cache) => cache.keys().then((requests) => Promise.all(
+        requests
+          .filter((request) => !currentKeys.has(request.url))
+          .map((request) => cache.delete(request))
+      )))
+      .then(() => self.clients.claim())
   );
 });
+
+function isCacheable(response) {
+  return response && response.ok && response.type === 'basic' && !response.redirected;
+}
+
+function offlineFallback(request) {
+  if (request.mode !== 'navigate') {
+    return Response.error();
+  }
+  const offlineKey = precacheKeys.get(new URL('/offline', self.location.origin).href);
+  return caches.match(offlineKey || '/offline').then((response) => response || Response.error());
+}
+
+function cacheFirst(request, cacheName) {
+  return caches.open(cacheName).then((cache) => cache.match(request).then((cached) => {
+    if (cached) {
+      return cached;
+    }
+    return fetch(request).then((response) => {
+      if (isCacheable(response)) {
+        cache.put(request, response.clone());
+      }
+      return response;
+    });
+  }));
+}
+
+function networkFirst(request, cacheName) {
+  return caches.open(cacheName).then((cache) => fetch(request)
+    .then((response) => {
+      if (isCacheable(response)) {
+        cache.put(request, response.clone());
+      }
+      return response;
+    })
+    .catch(() => cache.match(request).then((cached) => cached || offlineFallback(request))));
+}
+
+function staleWhileRevalidate(event, cacheName) {
+  const request = event.request;
+  return caches.open(cacheName).then((cache) => cache.match(request).then((cached) => {
+    const network = fetch(request).then((response) => {
+      if (isCacheable(response)) {
+        cache.put(request, response.clone());
+      }
+      return response;
+    });
+    if (cached) {
+      event.waitUntil(network.catch(() => null));
+      return cached;
+    }
+    return network.catch(() => offlineFallback(request));
+  }));
+}
+
+function matches(routes, pathname) {
+  return routes.some((route) => route.test(pathname));
+}
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) {
+    return;
+  }
+
+  if (matches(NETWORK_ONLY_ROUTES, url.pathname)) {
+    if (url.pathname === '/logout') {
+      event.waitUntil(Promise.all(USER_CACHES.map((cacheName) => caches.delete(cacheName))));
+    }
+    return;
+  }
+
+  const precached = precacheKeys.get(url.href);
+  if (precached) {
+    event.respondWith(
+      caches.match(precached).then((response) => response || fetch(request))
+    );
+    return;
+  }
+
+  // The page revalidates its own IndexedDB copy; let the 304 through untouched
+  if (request.headers.has('If-None-Match')) {
+    return;
+  }
+
+  if (FINGERPRINTED_ASSET.test(url.pathname)) {
+    event.respondWith(cacheFirst(request, STATIC_CACHE_NAME));
+  } else if (url.pathname.startsWith('/static/')) {
+    event.respondWith(staleWhileRevalidate(event, STATIC_CACHE_NAME));
+  } else if (matches(STALE_WHILE_REVALIDATE_ROUTES, url.pathname)) {
+    event.respondWith(staleWhileRevalidate(event, CONTENT_CACHE_NAME));
+  } else if (matches(NETWORK_FIRST_ROUTES, url.pathname) || request.mode === 'navigate') {
+    event.respondWith(networkFirst(request, PAGES_CACHE_NAME));
+  }
+});
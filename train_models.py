@@ -0,0 +1,41 @@
+import argparse
+import json
+import time
+
+def train():
+    from main import app
+    from services.ai_service import save_default_models
+    with app.app_context():
+        version = save_default_models()
+    print(f"Saved default models version {version}")
+
+def report_cold_start():
+    start = time.perf_counter()
+    from main import app
+    import_seconds = time.perf_counter() - start
+
+    from services.ai_service import DEFAULT_MODEL_SET, DEFAULT_MODELS, get_model_registry
+    report = {'import_main_seconds': round(import_seconds, 4), 'models': {}}
+    with app.app_context():
+        registry = get_model_registry()
+        models, version = registry.get(DEFAULT_MODEL_SET)
+        for name in DEFAULT_MODELS:
+            loaded = models is not None and name in models
+            report['models'][name] = {
+                'version': version if loaded else None,
+                'load_seconds': round(registry.load_timings[name], 4) if loaded else None,
+            }
+    report['total_seconds'] = round(time.perf_counter() - start, 4)
+    print(json.dumps(report, indent=2))
+    return all(entry['version'] for entry in report['models'].values())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and inspect the saved model artifacts.")
+    parser.add_argument('command', choices=['train', 'cold-start'],
+                        help="'train' fits and saves new versions of the default models; "
+                             "'cold-start' reports import and artifact load times")
+    args = parser.parse_args()
+    if args.command == 'train':
+        train()
+    elif not report_cold_start():
+        raise SystemExit("Some model artifacts are missing; run 'python train_models.py train'")